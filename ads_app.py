@@ -7,7 +7,6 @@ import json
 import pandas as pd
 import folium
 import datetime
-from geopy.distance import geodesic
 from contextlib import contextmanager
 
 from PyQt5 import QtCore, QtGui, QtWidgets
@@ -40,6 +39,13 @@ from pages.lidarProcessApp import lidarProcessApp
 from pages.autoScenarioApp import AutoscenarioApp
 from pages.reportApp import report_Generator
 from pages.ttcApp import TTCPlotApp
+from pages.topicIO import open_compressed
+from pages.lazyTrip import register_bag_source
+from pages.tripStore import TripStore
+from pages.timeIndex import TimeIndex, CameraSync
+from pages.tripDoc import TripDocument
+from pages.tripSummary import trip_summary
+from pages.tripCatalogApp import TripCatalogApp
 
 file_path = os.path.abspath(__file__)
 dir_path = os.path.dirname(file_path)
@@ -62,48 +68,13 @@ def show_error(message, parent=None):
     msg.setText(message)
     msg.exec_()
 
-def dict_diff(d1, d2):
-    k1, k2 = set(d1), set(d2)
-    matched = d1==d2
-    return matched, {
-        "only_in_d1": k1 - k2,
-        "only_in_d2": k2 - k1,
-        "value_mismatches": {
-            k: (d1[k], d2[k]) for k in k1 & k2 if d1[k] != d2[k]
-        }
-    }
+def find_closest_time(gps_index, lat, lon):
+    # flat earth distance, fine for picking the closest point of one trip
+    points = np.asarray(gps_index.values, dtype=float)
+    d_lat = points[:, 0] - lat
+    d_lon = (points[:, 1] - lon) * np.cos(np.radians(lat))
+    return gps_index.times[np.argmin(d_lat**2 + d_lon**2)]
 
-def calculate_trip_distance(gps_dict):
-    sorted_times = sorted(gps_dict.keys())
-    gps_points = [tuple(gps_dict[t]) for t in sorted_times]
-
-    total_km = 0
-    for i in range(len(gps_points) - 1):
-        total_km += geodesic(gps_points[i], gps_points[i + 1]).kilometers
-
-    total_miles = total_km * 0.621371
-    return total_km, total_miles
-
-def find_closest_time_geopy(gps_dict, lat, lon):
-    target_coord = (lat, lon)
-
-    def distance_to_target(coord):
-        return geodesic(coord, target_coord).meters
-
-    closest_time = min(gps_dict, key=lambda t: distance_to_target(gps_dict[t]))
-    return closest_time
-
-def find_closest_frame(frame_dict, time):
-    closest_frame = min(frame_dict, key=lambda f: abs(int(f) - int(time)))
-    return closest_frame
-
-def get_closest(key, dict):
-        try:
-            return key, dict[key]
-        except:
-            key_n = min(dict.keys(), key=lambda x: abs(int(x) - int(key)))
-            return key_n, dict[key_n]
-        
 def format_time(seconds, show_hours=False):
     hours = int(seconds // 3600)
     mins = int((seconds % 3600) // 60)
@@ -170,6 +141,7 @@ class SelectablePlotWidget(QtWidgets.QFrame):
     def plot(self, x, y, **kwargs):
         self._x = x
         self._y = y
+        self._lookup = TimeIndex(x, np.arange(len(x)))
         self.plot_widget.plot(x, y, **kwargs)
 
     def on_mouse_moved(self, pos):
@@ -180,8 +152,8 @@ class SelectablePlotWidget(QtWidgets.QFrame):
             x_val = mouse_point.x()
             self.hover_line.setPos(x_val)
 
-            if self._x:
-                index = np.abs(np.array(self._x) - x_val).argmin()
+            if len(self._x):
+                index = self._lookup.nearest(x_val)[1]
                 y_val = self._y[index]
                 self.label.setText(f"x={self._x[index]:.2f}\ny={y_val:.2f}")
                 self.label.setPos(self._x[index], y_pos)
@@ -241,6 +213,10 @@ class MainApp(QtWidgets.QMainWindow, Ui_MainWindow):
         self.setupUi(self)
         self.adjustUI()
         self.sync = {}
+        self.camera = None
+        self.gps_index = TimeIndex()
+        self.store = None
+        self.doc = TripDocument()
 
     def adjustUI(self):
         self.mapView = QWebEngineView(self.groupBox_2)
@@ -309,6 +285,7 @@ class MainApp(QtWidgets.QMainWindow, Ui_MainWindow):
         self.actionScenario_Detection.triggered.connect(self.add_on_auto_scenario_detection)
         self.actionGenerate_Report.triggered.connect(self.add_on_generate_report)
         self.actionTTC_Tool.triggered.connect(self.add_on_add_ttc)
+        self.actionTrip_Catalog.triggered.connect(self.add_on_open_trip_catalog)
         self.cameraSelect.currentIndexChanged.connect(self.video_load)
         self.ROStimeBox.textChanged.connect(self.main_wallclock_update)
         self.playBut.clicked.connect(self.video_play_callback)
@@ -347,8 +324,8 @@ class MainApp(QtWidgets.QMainWindow, Ui_MainWindow):
         if 'lidar' not in self.main_dict.keys():
             return
         file_ = os.path.join(self.main_dict['pwd'], self.main_dict['lidar'])
-        with open(file_, 'r') as f:
-            self.lidar = json.load(f)
+        with open_compressed(file_) as f:
+            self.lidar = TimeIndex.from_dict(json.load(f))
 
     def lidar_clean(self):
         for item in self.lidarView.items[1:]:
@@ -356,9 +333,9 @@ class MainApp(QtWidgets.QMainWindow, Ui_MainWindow):
 
     
     def lidar_plot(self):
-        if self.lidar is None:
+        if not self.lidar:
             return
-        current_ = get_closest(int(self.ROStimeBox.toPlainText()), self.lidar)[1]
+        current_ = self.lidar.nearest(int(self.ROStimeBox.toPlainText()))[1]
         self.lidar_clean()
         for obj in current_:
             if np.abs(obj[1]) < .5 and np.abs(obj[0]) < 3:
@@ -413,11 +390,13 @@ class MainApp(QtWidgets.QMainWindow, Ui_MainWindow):
 
     def plot_marker_moved_callback(self, time_value):
         self.ROStimeBox.setText(str(int(time_value)))
-        new_frame = get_closest(str(int(time_value)), self.sync['rev'])[1]
-        self.video_slider_moved_callback(int(new_frame))
+        self.video_slider_moved_callback(self.camera.time_frame(time_value))
 
     def plot_list_update(self, new_dict):
         self.main_dict = new_dict
+        self.doc.data = new_dict
+        self.doc.touch('plots')
+        self.store.main_dict = new_dict
         self.plot_load()
 
     def plot_remove(self):
@@ -428,6 +407,7 @@ class MainApp(QtWidgets.QMainWindow, Ui_MainWindow):
             selected_plot.deleteLater()
             self.selection_manager.current = None
             self.main_dict['plots'].pop(idx)
+            self.doc.touch('plots')
 
     def plot_remove_all(self):
         for i in reversed(range(self.scrollLayout.count())):
@@ -440,7 +420,7 @@ class MainApp(QtWidgets.QMainWindow, Ui_MainWindow):
             obj.reset_view()
 
     def plot_app_open(self):
-        self.plot_app_wizard = PlotApp(self.main_dict, self.plot_list_update)
+        self.plot_app_wizard = PlotApp(self.main_dict, self.plot_list_update, self.store)
         self.plot_app_wizard.show()
 
     def plot_load(self):
@@ -450,15 +430,8 @@ class MainApp(QtWidgets.QMainWindow, Ui_MainWindow):
         for plt in self.main_dict['plots']:
             time = []
             y = []
-            for file in self.main_dict['topics'][plt[1]]:
-                file_path = os.path.join(self.main_dict['pwd'], 'csv', file + '.' + plt[1])
-                data = pd.read_csv(file_path)
-                if plt[2] in data.columns and 'time' in data.columns:
-                    for i in range(len(data)):
-                        time.append(data['time'][i])
-                        y.append(data[plt[2]][i])
-                else:
-                    continue
+            if self.store.has(plt[1], plt[2]) and self.store.has(plt[1], 'time'):
+                time, y = self.store.columns(plt[1], ['time', plt[2]])
             self.plot_add_new(time, y, plt[2], plt[0])
         self.plot_sync_time_axis()
         self.plot_reset_view_all()
@@ -483,14 +456,10 @@ class MainApp(QtWidgets.QMainWindow, Ui_MainWindow):
             self.video_play_callback()
             for topic in self.main_dict['topics'].keys():
                 if topic in self.cameraSelect.currentText():
-                    self.sync['current'] = self.sync[topic]
-                    rev = {}
-                    for key in self.sync['current'].keys():
-                        rev[self.sync['current'][key]] = key
-                    self.sync['rev'] = rev
+                    self.camera = self.sync[topic]
                     break
         if ref_time != '':
-            self.video_slider_moved_callback(get_closest(ref_time, self.sync['rev'])[1])
+            self.video_slider_moved_callback(self.camera.time_frame(int(ref_time)))
 
     def video_camera_select(self):
         self.cameraSelect.clear()
@@ -498,15 +467,13 @@ class MainApp(QtWidgets.QMainWindow, Ui_MainWindow):
             self.cameraSelect.addItem(self.main_dict['video'][i])
 
     def video_camera_sync(self):
+        # built once per trip, switching cameras just picks one
         self.sync = {}
+        self.camera = None
         for video in self.main_dict['video']:
             for topic in self.main_dict['topics'].keys():
-                if topic in video:
-                    self.sync[topic] = {}
-                    for key in self.main_dict['topics'][topic]:
-                        data = pd.read_csv(os.path.join(self.main_dict['pwd'], 'csv', key + '.' + topic))
-                        for i in range(len(data)):
-                            self.sync[topic][int(data['seq'][i])] = int(data['time'][i])
+                if topic in video and topic not in self.sync:
+                    self.sync[topic] = CameraSync(*self.store.columns(topic, ['seq', 'time']))
 
     def video_play_callback(self):
             if self.playing:
@@ -545,13 +512,14 @@ class MainApp(QtWidgets.QMainWindow, Ui_MainWindow):
         self.cameaDisplay.setPixmap(pixmap)
 
         frame_id = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
-        try:
-            self.ROStimeBox.setText(str(self.sync['current'][frame_id]))
+        frame_time = self.camera.frame_time(frame_id) if self.camera is not None else None
+        if frame_time is None:
+            self.ROStimeBox.setText('')
+        else:
+            self.ROStimeBox.setText(str(frame_time))
             for obj in self.plot_obj_list:
                 with obj.block_signal():
-                    obj.map_current_position_callback(self.sync['current'][frame_id])
-        except KeyError:
-            self.ROStimeBox.setText('')
+                    obj.map_current_position_callback(frame_time)
         passed_time_sec = frame_id / self.fps
         remaining_time_sec = (self.total_frames - frame_id) / self.fps
         self.pasTime.setText(format_time(passed_time_sec))
@@ -586,10 +554,9 @@ class MainApp(QtWidgets.QMainWindow, Ui_MainWindow):
 
     ## MAP Control
     def map_current_position_callback(self, lat, lon):
-        new = find_closest_time_geopy(self.gps, lat, lon)
+        new = find_closest_time(self.gps_index, lat, lon)
         # self.ROStimeBox.setText(str(new))
-        new_frame = get_closest(str(new), self.sync['rev'])[1]
-        self.video_slider_moved_callback(int(new_frame))
+        self.video_slider_moved_callback(self.camera.time_frame(new))
 
     def map_load(self):
         file_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "map.html"))
@@ -612,12 +579,9 @@ class MainApp(QtWidgets.QMainWindow, Ui_MainWindow):
         self.map_load()
     
     def map_generate_gps_dictionary(self):
-        self.gps = {}
-        for file in self.main_dict['topics']['pos']:
-            file_path = os.path.join(self.main_dict['pwd'], 'csv', file + '.pos')
-            data = pd.read_csv(file_path)
-            for i in range(len(data)):
-                self.gps[int(data['time'][i])] = [float(data['lat'][i]), float(data['lon'][i])]
+        time, lat, lon = self.store.columns('pos', ['time', 'lat', 'lon'])
+        self.gps = dict(zip(time.astype(np.int64).tolist(), np.column_stack((lat, lon)).astype(float).tolist()))
+        self.gps_index = TimeIndex(time, np.column_stack((lat, lon)).astype(float))
 
 
     # Scenario Control
@@ -641,9 +605,11 @@ class MainApp(QtWidgets.QMainWindow, Ui_MainWindow):
     def scenario_insert_from_app(self, time, scenario, add_scenario=None):
         if add_scenario is not None and add_scenario not in self.main_dict['additional_scenarios']:
             self.main_dict['additional_scenarios'].append(add_scenario)
+            self.doc.touch('additional_scenarios')
         time_p = datetime.datetime.fromtimestamp(float(time)/1e9).strftime('%H:%M:%S.%f')[:-3]
         id = self.scenList.count() + 1
         self.main_dict['scenarios'][time] = [id, scenario, time_p]  # time, scenario
+        self.doc.touch('scenarios')
         self.scenario_cleanup()
         self.scenList.clear()
         for key in self.main_dict['scenarios'].keys():
@@ -667,6 +633,7 @@ class MainApp(QtWidgets.QMainWindow, Ui_MainWindow):
             tmp = self.main_dict['scenarios'][key]
             if tmp[0] == id:
                 del self.main_dict['scenarios'][key]
+                self.doc.touch('scenarios')
                 self.scenario_cleanup()
                 self.scenList.clear()
                 break
@@ -681,8 +648,7 @@ class MainApp(QtWidgets.QMainWindow, Ui_MainWindow):
             tmp = self.main_dict['scenarios'][key]
             if tmp[0] == id:
                 self.ROStimeBox.setText(str(key))
-                new_frame = get_closest(str(key), self.sync['rev'])[1]
-                self.video_slider_moved_callback(int(new_frame))
+                self.video_slider_moved_callback(self.camera.time_frame(int(key)))
                 return
 
     def scenario_cleanup(self):
@@ -692,6 +658,8 @@ class MainApp(QtWidgets.QMainWindow, Ui_MainWindow):
         time_list.sort()
         for id, time in enumerate(time_list):
             self.main_dict['scenarios'][time] = [id+1, tmp[time][1], tmp[time][2]]
+        if list(self.main_dict['scenarios'].items()) != list(tmp.items()):
+            self.doc.touch('scenarios')
 
 
 
@@ -719,17 +687,21 @@ class MainApp(QtWidgets.QMainWindow, Ui_MainWindow):
         self.ROStimeBox.setText('')
         self.DTBox.setText('')
         self.NOW = -1
-        self.FILENAME = ''
-        self.main_dict = {}
+        self.doc = TripDocument()
+        self.main_dict = self.doc.data
         self.sync = {}
+        self.camera = None
         self.gps = {}
+        self.gps_index = TimeIndex()
+        self.lidar = None
+        self.store = None
 
       
     def main_wallclock_update(self):
         try:
             self.NOW = int(self.ROStimeBox.toPlainText())
             self.DTBox.setText(str(datetime.datetime.fromtimestamp(float(self.NOW)/1e9)))
-            self.bridge.map_current_position_callback(get_closest(self.NOW, self.gps)[1])
+            self.bridge.map_current_position_callback(self.gps_index.nearest(self.NOW)[1])
             self.lidar_plot()
         except:
             self.NOW = -1
@@ -743,27 +715,29 @@ class MainApp(QtWidgets.QMainWindow, Ui_MainWindow):
     def main_extract_info(self):
         if 'info' in self.main_dict.keys():
             return
-        time_array = np.array([float(key) for key in self.gps.keys()])
-        time_array = time_array/1e9
+        summary = trip_summary(self.store)
         info = {}
-        starting_time = datetime.datetime.fromtimestamp(np.min(time_array))
+        starting_time = datetime.datetime.fromtimestamp(summary['start_time'])
         info['starting time'] = str(starting_time)
-        info['trip duration (s)'] = str(int(np.max(time_array)-np.min(time_array)))
-        info['trip duration'] = format_time(int(time_array[-1]-time_array[0]))
-        info['traveled distance Km'] = f'{calculate_trip_distance(self.gps)[0]:.2f}'
-        info['traveled distance mi'] = f'{calculate_trip_distance(self.gps)[1]:.2f}'
+        info['trip duration (s)'] = str(int(summary['duration']))
+        info['trip duration'] = format_time(int(summary['duration']))
+        info['traveled distance Km'] = f"{summary['distance_km']:.2f}"
+        info['traveled distance mi'] = f"{summary['distance_mi']:.2f}"
         self.main_dict['info'] = info
+        self.doc.touch('info')
 
     def main_update_dict(self, new_dict):
         self.main_dict = new_dict
+        self.doc.data = new_dict
+        self.doc.touch('lidar')
+        if self.store is not None and os.path.normpath(self.store.pwd) == os.path.normpath(new_dict.get('pwd', '')):
+            self.store.main_dict = new_dict
+        else:
+            self.store = TripStore(new_dict)
         self.save_dads()
 
     def closeEvent(self, event):
-        with open(self.FILENAME, 'r') as f:
-            to_compare = json.load(f)
-        matched, diffs = dict_diff(self.main_dict, to_compare)
-
-        if matched:
+        if not self.doc.is_dirty():
             event.accept()
             return
         reply = QMessageBox.question(
@@ -804,28 +778,32 @@ class MainApp(QtWidgets.QMainWindow, Ui_MainWindow):
         file_path, _ = file_dialog.getOpenFileName(caption="Open DADS File", filter="Trip Files (*.DADS)")
         if file_path == "":
             return
+        self.open_dads_file(file_path)
+
+    def open_dads_file(self, file_path):
+        if self.doc.path:
+            self.main_refresh()
         dir_name = os.path.dirname(file_path)
-        self.FILENAME = file_path
-        self.main_dict = {}
-        with open(file_path, 'r') as f:
-            self.main_dict = json.load(f)
+        self.doc = TripDocument.open(file_path)
+        self.main_dict = self.doc.data
         self.main_dict['pwd'] = dir_name
+        if 'config' in self.main_dict:
+            register_bag_source(dir_name, self.main_dict['config'])
         if 'scenarios' not in self.main_dict.keys():
             self.main_dict['scenarios'] = {}
+        self.store = TripStore(self.main_dict)
         self.load_all()
         self.main_button_set_all(True)
 
     def save_dads(self):
-        with open(self.FILENAME, 'w') as f:
-            json.dump(self.main_dict, f, indent=4)
+        self.doc.save()
 
     def save_as_dads(self):
         file_dialog = QFileDialog()
         file_path, _ = file_dialog.getSaveFileName(caption="Save File", filter="Trip Files (*.DADS)")
         if file_path == "":
             return
-        self.FILENAME = file_path
-        self.save_dads()
+        self.doc.save(file_path)
 
     
     # Extra Tools
@@ -841,6 +819,12 @@ class MainApp(QtWidgets.QMainWindow, Ui_MainWindow):
         self.video_window = VideoApp()
         self.video_window.show()
 
+    def add_on_open_trip_catalog(self):
+        # start in the folder holding the open trip's folder
+        root = os.path.dirname(os.path.dirname(self.doc.path)) if self.doc.path else None
+        self.catalog_window = TripCatalogApp(self.open_dads_file, root)
+        self.catalog_window.show()
+
     def add_on_open_about(self):
         self.about_window = aboutPage()
         self.about_window.show()
@@ -850,17 +834,24 @@ class MainApp(QtWidgets.QMainWindow, Ui_MainWindow):
         self.lidar_window.show()
 
     def add_on_auto_scenario_detection(self):
-        self.auto_scena_det = AutoscenarioApp(self.main_dict, external_1=self.scenario_insert_from_app)
+        self.auto_scena_det = AutoscenarioApp(self.main_dict, external_1=self.scenario_insert_from_app, store=self.store)
         self.auto_scena_det.show()
 
     def add_on_generate_report(self):
-        report = report_Generator(self.main_dict, self.gps)
+        report = report_Generator(self.main_dict, self.gps, self.store)
         report.generate_report()
     
     def add_on_add_ttc(self):
-        ttc_app = TTCPlotApp(self.main_dict)
-        if not ttc_app.run():
+        ttc_app = TTCPlotApp(self.main_dict, self.store)
+        before = list(self.main_dict['topics'].get('time_to_collision', []))
+        added = ttc_app.run()
+        self.store.invalidate('time_to_collision')
+        # the trip only changes when the TTC bag list does
+        if self.main_dict['topics'].get('time_to_collision', []) != before:
+            self.doc.touch('topics')
+        if not added:
             show_error("Time To Collision calculation failed!")
+            return
 
         reply = QMessageBox.question(
             None,
@@ -873,6 +864,7 @@ class MainApp(QtWidgets.QMainWindow, Ui_MainWindow):
         if reply == QMessageBox.Yes:
             last_id  = self.main_dict['plots'][-1][0]
             self.main_dict['plots'].append([last_id+1, 'time_to_collision', 'ttc'])
+            self.doc.touch('plots')
             self.plot_load()
 
             
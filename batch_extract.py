@@ -0,0 +1,179 @@
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing as mp
+from itertools import cycle
+from rosbags.typesys import Stores, get_typestore
+
+from pages.topicIO import TOPIC_FORMATS, CODECS, find_topic_file
+from pages.bagCatalog import load_catalog, config_keys
+from pages.lazyTrip import trip_config
+from pages.bagExtract import (
+    build_tasks, run_task, merge_bag_parts, load_config, is_video_config,
+    parse_time, resolve_window, get_window, task_entry, sum_stats, append_run_log, whole_bag_keys
+)
+from pages.videoExtract import gen_video_task, build_video_tasks, video_path
+from pages.tripDoc import write_dads
+
+# Headless counterpart of the Bag to CSV tool: extracts every bag found under
+# a directory tree into <bag folder>/csv and prints a JSON summary.
+
+def find_bags(root):
+    drives = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d != 'csv' and not d.startswith('.'))
+        bags = sorted(f for f in filenames if f.endswith('.bag'))
+        if bags:
+            drives[dirpath] = bags
+    return drives
+
+def starter_dads(bag_dir, bags, cfg, catalog=None):
+    # same layout the Wizard writes, without map. With a catalog the topics
+    # recorded in the bags are listed whether extracted or not; videos are
+    # listed once extracted.
+    csv_dir = os.path.join(bag_dir, 'csv')
+    topics = {}
+    for config_key in cfg:
+        if catalog is None:
+            found = [bag for bag in bags if find_topic_file(csv_dir, bag, config_key)]
+        else:
+            found = [bag for bag in bags if config_key in config_keys(catalog.get(bag), cfg)]
+        if found:
+            topics[config_key] = found
+    videos = [video_path(bag_dir, config_key) for config_key in cfg if is_video_config(cfg[config_key])]
+    videos = [os.path.relpath(path, bag_dir) for path in videos if os.path.exists(path)]
+    main_dict = {'pwd': bag_dir + '/', 'bags': bags, 'topics': topics, 'video': videos}
+    main_dict['config'] = trip_config(main_dict, cfg)
+    return main_dict
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract rosbag topics of a drive directory tree.")
+    parser.add_argument("root", help="Directory searched recursively for *.bag files")
+    parser.add_argument("-c", "--config", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json'),
+                        help="Topic config (default: config.json next to this script)")
+    parser.add_argument("-j", "--workers", type=int, default=mp.cpu_count(), help="Number of worker processes")
+    parser.add_argument("-f", "--format", choices=TOPIC_FORMATS, default='csv', help="Output format")
+    parser.add_argument("-z", "--codec", choices=CODECS, default='none', help="Compress outputs")
+    parser.add_argument("--fast-path", action="store_true", help="Decode plain topics straight from raw messages")
+    parser.add_argument("--single-pass", action="store_true", help="Read each bag once for all topics")
+    parser.add_argument("--split-bags", action="store_true", help="Split bags across workers (with --single-pass)")
+    parser.add_argument("--override", action="store_true", help="Redo outputs that are up to date")
+    parser.add_argument("--start", default='', help="Window start, bag time in s or ns")
+    parser.add_argument("--end", default='', help="Window end, bag time in s or ns")
+    parser.add_argument("--relative", action="store_true",
+                        help="--start/--end are seconds from the start of each bag folder's first bag")
+    parser.add_argument("-o", "--summary", help="Write the JSON summary here instead of stdout")
+    parser.add_argument("--dads", action="store_true", help="Write a starter <folder>.DADS into every bag folder")
+    parser.add_argument("--lazy", action="store_true",
+                        help="Only write bag backed starter .DADS files, topics are extracted when first opened")
+    args = parser.parse_args()
+
+    cfg = load_config(args.config)
+    try:
+        start, stop = parse_time(args.start, args.relative), parse_time(args.end, args.relative)
+    except ValueError as e:
+        sys.exit(str(e))
+    drives = find_bags(args.root)
+    if not drives:
+        sys.exit(f"No bag files found under {args.root}")
+
+    options = {'override': args.override, 'format': args.format, 'codec': args.codec, 'fast_path': args.fast_path,
+               'start': start, 'stop': stop, 'relative': args.relative}
+    dir_options = {}
+    typestore = get_typestore(Stores.ROS1_NOETIC)
+    task_queue = []
+    jobs = {}
+    catalogs = {}
+    for bag_dir, bags in drives.items():
+        catalog = load_catalog([os.path.join(bag_dir, bag) for bag in bags])
+        catalogs[bag_dir] = catalog
+        if args.lazy:
+            continue
+        try:
+            dir_options[bag_dir] = resolve_window(options, catalog)
+        except ValueError as e:
+            print(f"Skipped {bag_dir}: {e}", file=sys.stderr)
+            continue
+        os.makedirs(os.path.join(bag_dir, 'csv'), exist_ok=True)
+        task_func, tasks, _, n_parts = build_tasks(bag_dir, bags, cfg, args.workers, args.single_pass,
+                                                   args.split_bags, catalog, get_window(dir_options[bag_dir]))
+        jobs[bag_dir] = n_parts
+        if n_parts > 1 and whole_bag_keys(cfg):
+            print(f"Not splitting sampled keys in {bag_dir}: {', '.join(whole_bag_keys(cfg))}", file=sys.stderr)
+        for task in build_video_tasks(bag_dir, bags, cfg, catalog, get_window(dir_options[bag_dir])):
+            task_queue.append((len(task_queue), gen_video_task, task))
+        for task in tasks:
+            task_queue.append((len(task_queue), task_func, task))
+    task_queue = [
+        (index, task_func, (worker_id, task, dir_options[task[1]], typestore))
+        for worker_id, (index, task_func, task) in zip(cycle(range(args.workers)), task_queue)
+    ]
+
+    entries = [None] * len(task_queue)
+    started = time.time()
+    with mp.Pool(args.workers) as pool:
+        for index, result, elapsed, stats in pool.imap_unordered(run_task, task_queue):
+            _, task_func, (_, task, _, _) = task_queue[index]
+            entries[index] = task_entry(task_func, task, elapsed, result, stats)
+            for line in result:
+                print(line, file=sys.stderr)
+
+    merged = []
+    for bag_dir, n_parts in jobs.items():
+        if n_parts > 1:
+            for bag_name in drives[bag_dir]:
+                merged += merge_bag_parts(bag_name, bag_dir, os.path.join(bag_dir, 'csv'), cfg,
+                                          dir_options[bag_dir], n_parts)
+
+    dads_files = []
+    if args.dads or args.lazy:
+        for bag_dir, bags in drives.items():
+            dads_path = os.path.join(bag_dir, os.path.basename(os.path.normpath(bag_dir)) + '.DADS')
+            if os.path.exists(dads_path) and not args.override:
+                continue
+            write_dads(dads_path, starter_dads(bag_dir, bags, cfg, catalogs[bag_dir] if args.lazy else None))
+            dads_files.append(dads_path)
+
+    lines = [line for entry in entries for line in entry['results']] + merged
+    summary = {
+        'root': os.path.abspath(args.root),
+        'config': os.path.abspath(args.config),
+        'workers': args.workers,
+        'options': options,
+        'bag_dirs': {bag_dir: len(bags) for bag_dir, bags in drives.items()},
+        'seconds': round(time.time() - started, 3),
+        'completed': sum(' Completed ' in line for line in lines),
+        'skipped': sum(' Skipped ' in line for line in lines),
+        'failed': sum(' Failed ' in line or line.startswith('Failed ') for line in lines),
+        'errors': sum(' Error ' in line for line in lines),
+        'totals': sum_stats([entry['stats'] for entry in entries]),
+        'tasks': entries,
+        'merged': merged,
+        'dads': dads_files,
+    }
+    for bag_dir in jobs:
+        dir_entries = [entry for entry in entries if entry['bag_dir'] == bag_dir]
+        append_run_log(bag_dir, {
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(started)),
+            'seconds': summary['seconds'],
+            'bags': drives[bag_dir],
+            'options': dir_options[bag_dir],
+            'processors': args.workers,
+            'single_pass': args.single_pass,
+            'split_bags': args.split_bags,
+            'cancelled': False,
+            'totals': sum_stats([entry['stats'] for entry in dir_entries]),
+            'tasks': dir_entries,
+        })
+    if args.summary:
+        with open(args.summary, 'w') as f:
+            json.dump(summary, f, indent=4)
+    else:
+        print(json.dumps(summary, indent=4))
+    sys.exit(1 if summary['errors'] else 0)
+
+
+if __name__ == "__main__":
+    main()
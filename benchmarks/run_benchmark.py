@@ -0,0 +1,169 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import resource
+import tempfile
+import multiprocessing as mp
+from pathlib import Path
+from importlib.metadata import version
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from rosbags.highlevel import AnyReader
+from rosbags.typesys import Stores, get_typestore
+
+from pages import bagExtract
+from pages.bagExtract import gen_csv_task, gen_bag_task, load_config, is_video_config, TaskStats
+from benchmarks.synthetic_bags import write_drive
+
+# Times extraction per config key (gen_csv_task) and per whole config
+# (gen_bag_task) on synthetic or given bags. Every case runs in a fresh
+# process so its peak RSS is its own. Output is one JSON document with
+# sorted keys, meant to be diffed across releases.
+
+SCHEMA_VERSION = 1
+
+def peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / (1 << 20) if sys.platform == 'darwin' else rss / (1 << 10)
+
+def topic_stats(bag_paths):
+    # message count and serialized bytes per topic over all bags
+    stats = {}
+    typestore = get_typestore(Stores.ROS1_NOETIC)
+    for path in bag_paths:
+        with AnyReader([Path(path)], default_typestore=typestore) as reader:
+            for c, t, raw in reader.messages():
+                count, size = stats.get(c.topic, (0, 0))
+                stats[c.topic] = (count + 1, size + len(raw))
+    return stats
+
+def run_case(args):
+    bag_paths, out_dir, case, cfg, config_key, options = args
+    typestore = get_typestore(Stores.ROS1_NOETIC)
+    bagExtract.task_stats = TaskStats()
+    started = time.perf_counter()
+    results = []
+    for path in bag_paths:
+        bag_dir, bag_name = os.path.split(path)
+        if case == 'topic':
+            results.append(gen_csv_task((0, (bag_name, bag_dir, out_dir, cfg[config_key], config_key), options, typestore)))
+        else:
+            results += gen_bag_task((0, (bag_name, bag_dir, out_dir, cfg, None), options, typestore))
+    elapsed = time.perf_counter() - started
+    errors = [line for line in results if ' Error ' in line]
+    return elapsed, peak_rss_mb(), errors, bagExtract.task_stats.to_dict(elapsed)['stages']
+
+def run_isolated(ctx, args):
+    with ctx.Pool(1, maxtasksperchild=1) as pool:
+        return pool.apply(run_case, (args,))
+
+def main():
+    parser = argparse.ArgumentParser(description="Extraction throughput benchmark.")
+    parser.add_argument("--bags", help="Folder with bags to use instead of synthetic ones")
+    parser.add_argument("-c", "--config", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.json'))
+    parser.add_argument("-n", "--n-bags", type=int, default=1, help="Synthetic bags to write")
+    parser.add_argument("-d", "--duration", type=float, default=60, help="Seconds per synthetic bag")
+    parser.add_argument("-m", "--markers", type=int, default=20, help="Lidar markers per synthetic message")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Runs per case, the fastest is reported")
+    parser.add_argument("-k", "--keys", nargs='*', help="Config keys for the per topic cases (default: all)")
+    parser.add_argument("-f", "--formats", nargs='*', default=['csv', 'npz'])
+    parser.add_argument("-z", "--codecs", nargs='*', default=['none'], help="Output compression codecs")
+    parser.add_argument("-o", "--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    # video keys go through videoExtract, not the tasks timed here
+    cfg = {key: config for key, config in load_config(args.config).items() if not is_video_config(config)}
+    work_dir = tempfile.mkdtemp(prefix='ads_bench_')
+    try:
+        if args.bags:
+            bag_paths = sorted(str(p) for p in Path(args.bags).glob('*.bag'))
+        else:
+            bag_paths = write_drive(os.path.join(work_dir, 'bags'), args.n_bags, args.duration, args.markers)
+        stats = topic_stats(bag_paths)
+
+        cases = []
+        for fmt in args.formats:
+            for codec in args.codecs:
+                for fast_path in [False, True]:
+                    options = {'override': True, 'format': fmt, 'codec': codec, 'fast_path': fast_path}
+                    cases.append(('config', None, options))
+                    for config_key in args.keys or cfg:
+                        if config_key in cfg and cfg[config_key]['topic'] in stats:
+                            cases.append(('topic', config_key, options))
+
+        ctx = mp.get_context('spawn')
+        results = []
+        for case, config_key, options in cases:
+            keys = [config_key] if config_key else list(cfg)
+            topics = {cfg[k]['topic'] for k in keys if cfg[k]['topic'] in stats}
+            messages = sum(stats[t][0] for t in topics)
+            size = sum(stats[t][1] for t in topics)
+            runs = []
+            for _ in range(args.repeat):
+                out_dir = os.path.join(work_dir, 'out')
+                shutil.rmtree(out_dir, ignore_errors=True)
+                os.makedirs(out_dir)
+                runs.append(run_isolated(ctx, (bag_paths, out_dir, case, cfg, config_key, options)))
+            elapsed, _, _, stages = min(runs, key=lambda run: run[0])
+            out_dir = os.path.join(work_dir, 'out')
+            out_bytes = sum(os.path.getsize(os.path.join(out_dir, f)) for f in os.listdir(out_dir)
+                            if os.path.isfile(os.path.join(out_dir, f)))
+            results.append({
+                'case': case,
+                'key': config_key,
+                'format': options['format'],
+                'codec': options['codec'],
+                'fast_path': options['fast_path'],
+                'messages': messages,
+                'bytes': size,
+                'output_bytes': out_bytes,
+                'seconds': round(elapsed, 4),
+                'msgs_per_s': round(messages / elapsed, 1),
+                'mb_per_s': round(size / (1 << 20) / elapsed, 3),
+                'peak_rss_mb': round(max(run[1] for run in runs), 1),
+                'errors': sorted({line for run in runs for line in run[2]}),
+                'stages': stages,
+            })
+            print(f"{case:6} {config_key or '*':20} {options['format']:4} {options['codec']:4} fast={options['fast_path']!s:5} "
+                  f"{results[-1]['msgs_per_s']:>10} msgs/s {results[-1]['mb_per_s']:>8} MB/s", file=sys.stderr)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'schema_version': SCHEMA_VERSION,
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'rosbags': version('rosbags'),
+            'numpy': np.__version__,
+        },
+        'input': {
+            'synthetic': not args.bags,
+            'bags': len(bag_paths),
+            'bytes': sum(os.path.getsize(p) for p in bag_paths) if args.bags else None,
+            'duration_s': None if args.bags else args.duration,
+            'messages': sum(count for count, _ in stats.values()),
+            'topics': {topic: {'messages': count, 'bytes': size} for topic, (count, size) in stats.items()},
+        },
+        'repeat': args.repeat,
+        'results': results,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
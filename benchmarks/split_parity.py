@@ -0,0 +1,76 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rosbags.typesys import Stores, get_typestore
+
+from pages.bagExtract import build_tasks, run_task, merge_bag_parts, load_config
+from pages.topicIO import find_topic_file, read_topic_file
+from benchmarks.synthetic_bags import write_drive
+
+# Checks that a --split-bags run writes the same files and rows as an
+# unsplit one, with sampled keys at rates whose period does not divide a
+# second (3 Hz, 0.5 Hz) and a decimated key. Exits non-zero on a mismatch.
+
+SAMPLING = {'pos': {'resample_hz': 3}, 'ssc_velocity': {'resample_hz': 0.5}, 'speed': {'decimate': 3}}
+
+def extract(bag_dir, bag_names, cfg, processors, split_bags, options):
+    typestore = get_typestore(Stores.ROS1_NOETIC)
+    target_dir = os.path.join(bag_dir, 'csv')
+    shutil.rmtree(target_dir, ignore_errors=True)
+    os.makedirs(target_dir)
+    task_func, tasks, _, n_parts = build_tasks(bag_dir, bag_names, cfg, processors, True, split_bags)
+    lines = []
+    for index, task in enumerate(tasks):
+        lines += run_task((index, task_func, (0, task, options, typestore)))[1]
+    if n_parts > 1:
+        for bag_name in bag_names:
+            lines += merge_bag_parts(bag_name, bag_dir, target_dir, cfg, options, n_parts)
+    outputs = {}
+    for bag_name in bag_names:
+        for config_key in cfg:
+            path = find_topic_file(target_dir, bag_name, config_key)
+            outputs[bag_name, config_key] = None if path is None else read_topic_file(path)
+    return n_parts, lines, outputs
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare split and unsplit single pass extraction.")
+    parser.add_argument("-c", "--config", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.json'))
+    parser.add_argument("-d", "--duration", type=float, default=20, help="Seconds per synthetic bag")
+    parser.add_argument("-j", "--parts", type=int, default=4, help="Parts the bag is split into")
+    parser.add_argument("-f", "--format", choices=['csv', 'npz'], default='csv')
+    args = parser.parse_args()
+
+    cfg = load_config(args.config)
+    for config_key, sampling in SAMPLING.items():
+        cfg[config_key] = dict(cfg[config_key], **sampling)
+    options = {'override': True, 'format': args.format, 'fast_path': True}
+    work_dir = tempfile.mkdtemp(prefix='ads_parity_')
+    try:
+        bag_paths = write_drive(work_dir, 1, args.duration, markers=2)
+        bag_names = [os.path.basename(path) for path in bag_paths]
+        _, _, whole = extract(work_dir, bag_names, cfg, args.parts, False, options)
+        n_parts, lines, split = extract(work_dir, bag_names, cfg, args.parts, True, options)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    mismatches = []
+    for key, frame in whole.items():
+        other = split[key]
+        if frame is None or other is None:
+            if (frame is None) != (other is None):
+                mismatches.append(f"{key[1]}: output only in the {'split' if frame is None else 'unsplit'} run")
+        elif not frame.equals(other):
+            mismatches.append(f"{key[1]}: {len(frame)} rows unsplit, {len(other)} rows split")
+    print(json.dumps({'parts': n_parts, 'keys': len(whole), 'errors': [line for line in lines if ' Error ' in line],
+                      'mismatches': mismatches}, indent=2))
+    sys.exit(1 if mismatches or n_parts < 2 else 0)
+
+
+if __name__ == "__main__":
+    main()
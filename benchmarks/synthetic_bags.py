@@ -0,0 +1,323 @@
+import os
+import argparse
+from pathlib import Path
+import numpy as np
+from rosbags.rosbag1 import Writer
+from rosbags.typesys import Stores, get_typestore, get_types_from_msg
+
+# Writes deterministic ROS1 bags with the topics of config.json. The vendor
+# messages are not in the noetic store, so close stand-ins are registered
+# here; the definitions are stored in the bag like a real recording.
+
+MSG_DEFS = {
+    'novatel_oem7_msgs/msg/Oem7Header': """
+string message_name
+uint16 message_id
+uint8 message_type
+uint32 sequence_number
+uint8 time_status
+uint16 gps_week_number
+uint32 gps_week_milliseconds
+""",
+    'novatel_oem7_msgs/msg/SolutionStatus': "uint32 status",
+    'novatel_oem7_msgs/msg/PositionOrVelocityType': "uint32 type",
+    'novatel_oem7_msgs/msg/BESTPOS': """
+std_msgs/Header header
+Oem7Header nov_header
+SolutionStatus sol_status
+PositionOrVelocityType pos_type
+float64 lat
+float64 lon
+float64 hgt
+float32 undulation
+uint32 datum_id
+float32 lat_stdev
+float32 lon_stdev
+float32 hgt_stdev
+string stn_id
+float32 diff_age
+float32 sol_age
+uint8 num_svs
+uint8 num_sol_svs
+uint8 num_sol_l1_svs
+uint8 num_sol_multi_svs
+""",
+    'novatel_oem7_msgs/msg/BESTVEL': """
+std_msgs/Header header
+Oem7Header nov_header
+SolutionStatus sol_status
+PositionOrVelocityType vel_type
+float32 latency
+float32 diff_age
+float64 hor_speed
+float64 trk_gnd
+float64 ver_speed
+float32 reserved
+""",
+    'novatel_oem7_msgs/msg/HEADING2': """
+std_msgs/Header header
+Oem7Header nov_header
+SolutionStatus sol_status
+PositionOrVelocityType pos_type
+float32 length
+float32 heading
+float32 pitch
+float32 heading_stdev
+float32 pitch_stdev
+string rover_stn_id
+string master_stn_id
+uint8 num_sv_tracked
+uint8 num_sv_in_sol
+""",
+    'camera_msgs/msg/ElapsedTime': """
+std_msgs/Header header
+float64 elapsed_time
+""",
+    'gps_common/msg/GPSStatus': """
+std_msgs/Header header
+uint16 satellites_used
+int32[] satellite_used_prn
+uint16 satellites_visible
+int32[] satellite_visible_prn
+int32[] satellite_visible_z
+int32[] satellite_visible_azimuth
+int32[] satellite_visible_snr
+int16 status
+uint16 motion_source
+uint16 orientation_source
+uint16 position_source
+""",
+    'gps_common/msg/GPSFix': """
+std_msgs/Header header
+GPSStatus status
+float64 latitude
+float64 longitude
+float64 altitude
+float64 track
+float64 speed
+float64 climb
+float64 pitch
+float64 roll
+float64 dip
+float64 time
+float64 gdop
+float64 pdop
+float64 hdop
+float64 vdop
+float64 tdop
+float64 err
+float64 err_horz
+float64 err_vert
+float64[9] position_covariance
+uint8 position_covariance_type
+""",
+    'automotive_platform_msgs/msg/CurvatureFeedback': """
+std_msgs/Header header
+float32 curvature
+""",
+    'automotive_platform_msgs/msg/SteeringFeedback': """
+std_msgs/Header header
+float32 steering_wheel_angle
+""",
+    'automotive_platform_msgs/msg/SteeringWheel': """
+std_msgs/Header header
+float32 angle
+float32 angle_velocity
+""",
+    'automotive_platform_msgs/msg/VelocityAccelCov': """
+std_msgs/Header header
+float64 velocity
+float64 accleration
+float64 covariance
+""",
+    'vehicle_msgs/msg/AcceleratorPedalReport': """
+std_msgs/Header header
+float32 pedal_input
+float32 pedal_command
+float32 pedal_output
+bool enabled
+""",
+    'vehicle_msgs/msg/BrakeReport': """
+std_msgs/Header header
+float32 pedal_position
+float32 pedal_command
+float32 pedal_output
+bool enabled
+""",
+    'vehicle_msgs/msg/SteeringReport': """
+std_msgs/Header header
+float32 steering_wheel_angle
+float32 steering_wheel_command
+float32 steering_wheel_torque
+float32 speed
+bool enabled
+""",
+}
+
+# topic: (msgtype, rate in Hz)
+TOPICS = {
+    '/novatel/oem7/bestpos': ('novatel_oem7_msgs/msg/BESTPOS', 20),
+    '/novatel/oem7/bestvel': ('novatel_oem7_msgs/msg/BESTVEL', 20),
+    '/novatel/oem7/heading2': ('novatel_oem7_msgs/msg/HEADING2', 10),
+    '/detection/lidar_detector/objects_markers': ('visualization_msgs/msg/MarkerArray', 10),
+    '/cam_mono/elapsed_time': ('camera_msgs/msg/ElapsedTime', 30),
+    '/cam_zed2i/elapsed_time': ('camera_msgs/msg/ElapsedTime', 15),
+    '/gps/gps': ('gps_common/msg/GPSFix', 10),
+    '/ssc/curvature_feedback': ('automotive_platform_msgs/msg/CurvatureFeedback', 50),
+    '/ssc/steering_feedback': ('automotive_platform_msgs/msg/SteeringFeedback', 50),
+    '/ssc/steering_wheel': ('automotive_platform_msgs/msg/SteeringWheel', 50),
+    '/ssc/velocity_accel_cov': ('automotive_platform_msgs/msg/VelocityAccelCov', 50),
+    '/vehicle/accelerator_pedal_report': ('vehicle_msgs/msg/AcceleratorPedalReport', 50),
+    '/vehicle/brake_report': ('vehicle_msgs/msg/BrakeReport', 50),
+    '/vehicle/steering_report': ('vehicle_msgs/msg/SteeringReport', 50),
+}
+
+def get_synthetic_typestore():
+    typestore = get_typestore(Stores.ROS1_NOETIC)
+    types = {}
+    for name, text in MSG_DEFS.items():
+        types.update(get_types_from_msg(text, name))
+    typestore.register(types)
+    return typestore
+
+
+class MessageFactory:
+    # Builds the message of a topic for step i; values follow a slow drive
+    # (speed ramps, heading turns) so downstream tools get plausible data.
+    def __init__(self, typestore, markers, seed):
+        self.T = typestore.types
+        self.markers = markers
+        self.rng = np.random.default_rng(seed)
+
+    def header(self, i, t, frame_id=''):
+        T = self.T
+        stamp = T['builtin_interfaces/msg/Time'](sec=t // 10**9, nanosec=t % 10**9)
+        return T['std_msgs/msg/Header'](seq=i, stamp=stamp, frame_id=frame_id)
+
+    def nov(self, name, i, t):
+        T = self.T
+        nov_header = T['novatel_oem7_msgs/msg/Oem7Header'](
+            message_name=name, message_id=42, message_type=0, sequence_number=i, time_status=180,
+            gps_week_number=2300, gps_week_milliseconds=(t // 10**6) % (7 * 86400000))
+        return (nov_header, T['novatel_oem7_msgs/msg/SolutionStatus'](status=0),
+                T['novatel_oem7_msgs/msg/PositionOrVelocityType'](type=50))
+
+    def make(self, msgtype, i, t, s):
+        # s: seconds since the start of the drive
+        T = self.T
+        speed = 10 + 5 * np.sin(s / 60)
+        yaw = (s * 2) % 360
+        h = self.header(i, t)
+        if msgtype == 'novatel_oem7_msgs/msg/BESTPOS':
+            nov_header, sol, pos = self.nov('BESTPOS', i, t)
+            return T[msgtype](header=h, nov_header=nov_header, sol_status=sol, pos_type=pos,
+                              lat=42.3 + s * 1e-5, lon=-83.7 - s * 1e-5, hgt=260 + np.sin(s),
+                              undulation=-34.0, datum_id=61, lat_stdev=0.02, lon_stdev=0.02, hgt_stdev=0.05,
+                              stn_id='0' * (i % 4), diff_age=1.0, sol_age=0.0,
+                              num_svs=20, num_sol_svs=18, num_sol_l1_svs=18, num_sol_multi_svs=16)
+        if msgtype == 'novatel_oem7_msgs/msg/BESTVEL':
+            nov_header, sol, vel = self.nov('BESTVEL', i, t)
+            return T[msgtype](header=h, nov_header=nov_header, sol_status=sol, vel_type=vel,
+                              latency=0.05, diff_age=1.0, hor_speed=speed, trk_gnd=yaw,
+                              ver_speed=self.rng.normal(0, 0.05), reserved=0.0)
+        if msgtype == 'novatel_oem7_msgs/msg/HEADING2':
+            nov_header, sol, pos = self.nov('HEADING2', i, t)
+            return T[msgtype](header=h, nov_header=nov_header, sol_status=sol, pos_type=pos,
+                              length=1.2, heading=yaw, pitch=0.5, heading_stdev=0.1, pitch_stdev=0.2,
+                              rover_stn_id='R' * (i % 3), master_stn_id='M', num_sv_tracked=20, num_sv_in_sol=18)
+        if msgtype == 'camera_msgs/msg/ElapsedTime':
+            return T[msgtype](header=h, elapsed_time=s)
+        if msgtype == 'gps_common/msg/GPSFix':
+            n_sv = 8 + i % 5
+            prn = np.arange(n_sv, dtype=np.int32)
+            status = T['gps_common/msg/GPSStatus'](
+                header=h, satellites_used=n_sv - 2, satellite_used_prn=prn[:-2], satellites_visible=n_sv,
+                satellite_visible_prn=prn, satellite_visible_z=prn, satellite_visible_azimuth=prn,
+                satellite_visible_snr=prn, status=0, motion_source=0, orientation_source=0, position_source=0)
+            return T[msgtype](header=h, status=status, latitude=42.3 + s * 1e-5, longitude=-83.7 - s * 1e-5,
+                              altitude=260.0, track=yaw, speed=speed, climb=0.0, pitch=0.5, roll=0.1, dip=0.0,
+                              time=t / 1e9, gdop=1.0, pdop=1.0, hdop=1.0, vdop=1.0, tdop=1.0, err=0.1,
+                              err_horz=0.1, err_vert=0.2, position_covariance=np.zeros(9),
+                              position_covariance_type=2)
+        if msgtype == 'automotive_platform_msgs/msg/CurvatureFeedback':
+            return T[msgtype](header=h, curvature=0.01 * np.sin(s / 10))
+        if msgtype == 'automotive_platform_msgs/msg/SteeringFeedback':
+            return T[msgtype](header=h, steering_wheel_angle=0.3 * np.sin(s / 10))
+        if msgtype == 'automotive_platform_msgs/msg/SteeringWheel':
+            return T[msgtype](header=h, angle=0.3 * np.sin(s / 10), angle_velocity=0.03 * np.cos(s / 10))
+        if msgtype == 'automotive_platform_msgs/msg/VelocityAccelCov':
+            return T[msgtype](header=h, velocity=speed, accleration=5 / 60 * np.cos(s / 60), covariance=0.0)
+        if msgtype == 'vehicle_msgs/msg/AcceleratorPedalReport':
+            return T[msgtype](header=h, pedal_input=0.2, pedal_command=0.2, pedal_output=0.2, enabled=True)
+        if msgtype == 'vehicle_msgs/msg/BrakeReport':
+            return T[msgtype](header=h, pedal_position=0.0, pedal_command=0.0, pedal_output=0.0, enabled=True)
+        if msgtype == 'vehicle_msgs/msg/SteeringReport':
+            return T[msgtype](header=h, steering_wheel_angle=0.3 * np.sin(s / 10), steering_wheel_command=0.0,
+                              steering_wheel_torque=0.0, speed=speed, enabled=True)
+        if msgtype == 'visualization_msgs/msg/MarkerArray':
+            return T[msgtype](markers=[self.marker(h, j, s) for j in range(self.markers)])
+        raise KeyError(msgtype)
+
+    def marker(self, h, j, s):
+        T = self.T
+        position = T['geometry_msgs/msg/Point'](x=5.0 + j + np.sin(s + j), y=-10.0 + j, z=0.0)
+        orientation = T['geometry_msgs/msg/Quaternion'](x=0.0, y=0.0, z=0.0, w=1.0)
+        return T['visualization_msgs/msg/Marker'](
+            header=h, ns='objects', id=j, type=9, action=0,
+            pose=T['geometry_msgs/msg/Pose'](position=position, orientation=orientation),
+            scale=T['geometry_msgs/msg/Vector3'](x=1.0, y=1.0, z=1.0),
+            color=T['std_msgs/msg/ColorRGBA'](r=1.0, g=0.0, b=0.0, a=1.0),
+            lifetime=T['builtin_interfaces/msg/Duration'](sec=0, nanosec=100000000),
+            frame_locked=False, points=[], colors=[], text=['car', 'pedestrian', 'truck'][j % 3],
+            mesh_resource='', mesh_use_embedded_materials=False)
+
+
+def write_bag(path, duration, start_ns=1_700_000_000_000_000_000, markers=20, compression=None,
+              typestore=None, seed=0):
+    typestore = typestore or get_synthetic_typestore()
+    factory = MessageFactory(typestore, markers, seed)
+    path = Path(path)
+    if path.exists():
+        path.unlink()
+    events = []
+    for topic, (msgtype, rate) in TOPICS.items():
+        period = 10**9 // rate
+        for i in range(int(duration * rate)):
+            events.append((start_ns + i * period, topic, i))
+    events.sort()
+
+    writer = Writer(path)
+    if compression:
+        writer.set_compression(Writer.CompressionFormat[compression.upper()])
+    with writer:
+        connections = {topic: writer.add_connection(topic, msgtype, typestore=typestore)
+                       for topic, (msgtype, _) in TOPICS.items()}
+        for t, topic, i in events:
+            msgtype = TOPICS[topic][0]
+            msg = factory.make(msgtype, i, t, (t - start_ns) / 1e9)
+            writer.write(connections[topic], t, typestore.serialize_ros1(msg, msgtype))
+    return len(events)
+
+def write_drive(out_dir, n_bags, duration, markers=20, compression=None):
+    # consecutive bags of one drive, like a split recording
+    os.makedirs(out_dir, exist_ok=True)
+    typestore = get_synthetic_typestore()
+    paths = []
+    for k in range(n_bags):
+        path = os.path.join(out_dir, f"synthetic_{k}.bag")
+        write_bag(path, duration, start_ns=1_700_000_000_000_000_000 + k * int(duration * 1e9),
+                  markers=markers, compression=compression, typestore=typestore, seed=k)
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write synthetic rosbags with the config.json topics.")
+    parser.add_argument("out_dir")
+    parser.add_argument("-n", "--bags", type=int, default=1)
+    parser.add_argument("-d", "--duration", type=float, default=60, help="Seconds per bag")
+    parser.add_argument("-m", "--markers", type=int, default=20, help="Lidar markers per message")
+    parser.add_argument("--compression", choices=['bz2', 'lz4'], default=None)
+    args = parser.parse_args()
+    for path in write_drive(args.out_dir, args.bags, args.duration, args.markers, args.compression):
+        print(path)
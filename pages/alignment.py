@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+from pages.tripStore import BAG
+from pages.timeIndex import TimeIndex
+
+# Columns of several topics resampled onto one clock, e.g.
+#   align(store, [('ssc_velocity', ['velocity']), ('heading', ['heading'])],
+#         clock='ssc_velocity', method='nearest', tolerance=5e7)
+# The clock is a rate in Hz (over the span all topics cover), a topic whose
+# times are used (a video key gives the camera frame times) or an array of
+# ns times. method is 'nearest', 'backward' (last sample at or before, like
+# merge_asof) or 'linear' (text columns fall back to nearest). Clock times
+# further than tolerance ns from a sample get NaN. A column name already
+# taken by an earlier topic comes back as '<topic>.<column>'. Results for
+# rate and topic clocks are kept on the store until it is invalidated.
+
+MAX_ALIGNED = 16
+
+def topic_arrays(store, topic, columns, bag=None):
+    arrays = store.columns(topic, ['time'] + list(columns))
+    if bag is not None:
+        index = store.bags(topic).index(bag) if bag in store.bags(topic) else -1
+        mask = store.column(topic, BAG) == index
+        arrays = [x[mask] for x in arrays]
+    return arrays[0].astype(np.int64), arrays[1:]
+
+def clock_times(store, clock, specs, bag=None):
+    if isinstance(clock, str):
+        return topic_arrays(store, clock, [], bag)[0]
+    if not np.isscalar(clock):
+        return np.asarray(clock).astype(np.int64)
+    times = [topic_arrays(store, topic, [], bag)[0] for topic, _ in specs]
+    if not times or any(len(t) == 0 for t in times):
+        return np.array([], dtype=np.int64)
+    start = max(t.min() for t in times)
+    stop = min(t.max() for t in times)
+    return np.arange(start, stop + 1, 1e9 / clock).astype(np.int64)
+
+def resample(index, values, clock, method, tolerance):
+    if len(index) == 0:
+        return np.full(len(clock), np.nan)
+    numeric = np.issubdtype(values.dtype, np.number) or values.dtype == bool
+    if method == 'backward':
+        i = index.before(clock)
+        valid = i >= 0
+        i = np.maximum(i, 0)
+        gap = clock - index.times[i]
+    else:
+        i = np.atleast_1d(index.nearest_index(clock))
+        valid = np.ones(len(clock), dtype=bool)
+        gap = np.abs(clock - index.times[i])
+    if tolerance is not None:
+        valid &= gap <= tolerance
+    if method == 'linear' and numeric:
+        out = np.interp(clock, index.times, values.astype(float))
+        valid &= (clock >= index.times[0]) & (clock <= index.times[-1])
+    else:
+        out = values[i]
+    if valid.all():
+        return out
+    out = out.astype(float) if numeric else out.astype(object)
+    out[~valid] = np.nan if numeric else None
+    return out
+
+def align(store, specs, clock, method='nearest', tolerance=None, bag=None):
+    if method not in ('nearest', 'backward', 'linear'):
+        raise ValueError(f"Unknown alignment method {method}")
+    specs = [(topic, tuple(columns)) for topic, columns in specs]
+    key = None
+    if isinstance(clock, str) or np.isscalar(clock):
+        key = (tuple(specs), clock, method, tolerance, bag)
+        if key in store.aligned:
+            store.aligned.move_to_end(key)
+            return store.aligned[key].copy()
+    times = clock_times(store, clock, specs, bag)
+    frame = {'time': times}
+    for topic, columns in specs:
+        source_times, arrays = topic_arrays(store, topic, columns, bag)
+        index = TimeIndex(source_times)
+        for col, values in zip(columns, arrays):
+            name = col if col not in frame else f"{topic}.{col}"
+            frame[name] = resample(index, np.asarray(values)[index.values], times, method, tolerance)
+    frame = pd.DataFrame(frame)
+    if key is not None:
+        store.aligned[key] = frame
+        while len(store.aligned) > MAX_ALIGNED:
+            store.aligned.popitem(last=False)
+        frame = frame.copy()
+    return frame
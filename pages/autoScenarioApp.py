@@ -20,18 +20,23 @@ from PyQt5.QtCore import QObject, pyqtSlot, QUrl
 
 try:
     from pages.auto_scenario import Ui_Wiz_1
+    from pages.tripStore import TripStore
+    from pages.alignment import align
 except:
     from auto_scenario import Ui_Wiz_1
+    from tripStore import TripStore
+    from alignment import align
 
 file_path = os.path.abspath(__file__)
 dir_path = os.path.dirname(file_path)
 dir_path = os.path.dirname(dir_path)
 
 class AutoscenarioApp(QtWidgets.QWidget, Ui_Wiz_1):
-    def __init__(self, main_dict, parent=None, external_1=None, external_2=None):
+    def __init__(self, main_dict, parent=None, external_1=None, external_2=None, store=None):
         super(AutoscenarioApp, self).__init__(parent)
         self.setupUi(self)
         self.dict = main_dict
+        self.store = store if store is not None else TripStore(main_dict)
         self.external_1 = external_1
         self.external_2 = external_2
         self.adjustUI()
@@ -42,19 +47,9 @@ class AutoscenarioApp(QtWidgets.QWidget, Ui_Wiz_1):
         self.exportB.clicked.connect(self.export)
 
     def data_prep(self):
-        self.ssc_velocity = pd.DataFrame()
-        for csv_file in self.dict['topics']['ssc_velocity']:
-            csv_file = os.path.join(self.dict['pwd'], 'csv', csv_file + '.' + "ssc_velocity")
-            self.ssc_velocity = pd.concat((self.ssc_velocity, pd.read_csv(csv_file, index_col=None)))
-        
-        self.steering_feedback = pd.DataFrame()
-        for csv_file in self.dict['topics']['steering_feedback']:
-            csv_file = os.path.join(self.dict['pwd'], 'csv', csv_file + '.' + "steering_feedback")
-            self.steering_feedback = pd.concat((self.steering_feedback, pd.read_csv(csv_file, index_col=None)))
-        
-
-        self.ssc_velocity = self.ssc_velocity.sort_values('time')
-        self.steering_feedback = self.steering_feedback.sort_values('time')
+        # time sorted already
+        self.ssc_velocity = self.store.frame('ssc_velocity')
+        self.steering_feedback = self.store.frame('steering_feedback')
 
     def filter_rapid_events(self, df, min_gap_secs=5.0):
         df = df.sort_values('time')
@@ -82,10 +77,8 @@ class AutoscenarioApp(QtWidgets.QWidget, Ui_Wiz_1):
 
 
         # Lane Changes and Turns (merge steering and velocity)
-        merged = pd.merge_asof(
-            self.steering_feedback[['time', 'steering']].sort_values('time'),
-            self.ssc_velocity[['time', 'velocity']].sort_values('time'),
-            on='time')
+        merged = align(self.store, [('steering_feedback', ['steering']), ('ssc_velocity', ['velocity'])],
+                       clock='steering_feedback', method='backward')
         
         
         turns = merged[(merged['velocity'] < 10) & (merged['steering'].abs() > 2.0)]
@@ -0,0 +1,89 @@
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+from rosbags.rosbag1 import Reader
+
+# Topic metadata of bags read from their connection and index records only,
+# no message payload is touched. Entries are cached per bag folder in
+# .bag_catalog.json and rescanned when the bag size or mtime changes.
+
+CATALOG_FILE = '.bag_catalog.json'
+
+def scan_bag(path):
+    st = os.stat(path)
+    with Reader(path) as reader:
+        topics = {}
+        for c in reader.connections:
+            index = reader.indexes.get(c.id, [])
+            info = topics.setdefault(c.topic, {'msgtype': c.msgtype, 'count': 0, 'start': None, 'end': None})
+            info['count'] += len(index)
+            if index:
+                info['start'] = min(x for x in [info['start'], index[0].time] if x is not None)
+                info['end'] = max(x for x in [info['end'], index[-1].time] if x is not None)
+        start = reader.start_time if reader.message_count else None
+        end = reader.end_time if reader.message_count else None
+    for info in topics.values():
+        span = (info['end'] - info['start']) / 1e9 if info['count'] > 1 else 0
+        info['rate'] = round((info['count'] - 1) / span, 3) if span > 0 else 0.0
+    return {'size': st.st_size, 'mtime': st.st_mtime_ns, 'start': start, 'end': end,
+            'duration': (end - start) / 1e9 if start is not None else 0.0,
+            'messages': sum(info['count'] for info in topics.values()), 'topics': topics}
+
+def read_catalog_file(bag_dir):
+    try:
+        with open(os.path.join(bag_dir, CATALOG_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_catalog_file(bag_dir, entries):
+    path = os.path.join(bag_dir, CATALOG_FILE)
+    try:
+        with open(path + '.tmp', 'w') as f:
+            json.dump(entries, f)
+        os.replace(path + '.tmp', path)
+    except OSError:
+        pass
+
+def load_catalog(bag_paths, workers=8):
+    # {bag file name: entry}; unreadable bags map to None
+    by_dir = {}
+    for path in bag_paths:
+        by_dir.setdefault(os.path.dirname(os.path.abspath(path)), []).append(os.path.basename(path))
+    catalog = {}
+    for bag_dir, bags in by_dir.items():
+        cached = read_catalog_file(bag_dir)
+        stale = []
+        for bag in bags:
+            entry = cached.get(bag)
+            try:
+                st = os.stat(os.path.join(bag_dir, bag))
+            except OSError:
+                catalog[bag] = None
+                continue
+            if entry is not None and (entry['size'], entry['mtime']) == (st.st_size, st.st_mtime_ns):
+                catalog[bag] = entry
+            else:
+                stale.append(bag)
+        if stale:
+            def scan(bag):
+                try:
+                    return scan_bag(os.path.join(bag_dir, bag))
+                except Exception:
+                    return None
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for bag, entry in zip(stale, pool.map(scan, stale)):
+                    catalog[bag] = entry
+                    if entry is not None:
+                        cached[bag] = entry
+            write_catalog_file(bag_dir, cached)
+    return catalog
+
+def config_keys(entry, cfg):
+    # config keys whose topic is recorded in the bag
+    if entry is None:
+        return []
+    return [key for key in cfg if cfg[key]['topic'] in entry['topics']]
+
+def describe_topic(info):
+    return f"{info['msgtype']}, {info['count']} msgs, {info['rate']:.1f} Hz"
@@ -0,0 +1,660 @@
+import os
+import json
+import time
+import operator
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from rosbags.highlevel import AnyReader
+
+from pages.topicIO import (
+    topic_path, part_path, tmp_path, open_topic_writer, merge_topic_files,
+    config_hash, is_up_to_date, write_manifest, read_manifest, remove_manifest, remove_topic_variants
+)
+from pages.rawDecode import compile_raw_plan, RawBatcher
+
+# set in every pool worker by init_worker, messages read are reported back
+# through it in batches so the job can show msgs/s while tasks are running
+progress_queue = None
+PROGRESS_EVERY = 1000
+
+def init_worker(queue):
+    global progress_queue
+    progress_queue = queue
+
+
+class ProgressCounter:
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+
+    def tick(self):
+        self.count += 1
+        self.total += 1
+        if self.count >= PROGRESS_EVERY:
+            self.flush()
+
+    def flush(self):
+        if progress_queue is not None and self.count:
+            progress_queue.put(self.count)
+        self.count = 0
+
+# set by run_task for the task it runs; tasks called directly get a
+# throwaway one from get_task_stats
+task_stats = None
+STAGES = ['read', 'deserialize', 'format', 'write']
+
+class TaskStats:
+    # Messages and bytes read per topic, rows written per output and seconds
+    # per stage. The time since the previous lap goes to the stage named by
+    # lap(); writer time is measured by TimedWriter and left out of the lap
+    # it falls in, so stages add up to the time the task was busy.
+    def __init__(self):
+        self.topics = {}
+        self.rows = {}
+        self.stages = dict.fromkeys(STAGES, 0.0)
+        self.nested = 0.0
+        self.last = time.perf_counter()
+
+    def lap(self, stage=None):
+        now = time.perf_counter()
+        if stage is not None:
+            self.stages[stage] += now - self.last - self.nested
+        self.nested = 0.0
+        self.last = now
+
+    def message(self, topic, size):
+        self.lap('read')
+        counts = self.topics.get(topic)
+        if counts is None:
+            counts = self.topics[topic] = [0, 0]
+        counts[0] += 1
+        counts[1] += size
+
+    def wrote(self, key, rows, seconds):
+        self.rows[key] = self.rows.get(key, 0) + rows
+        self.stages['write'] += seconds
+        self.nested += seconds
+
+    def to_dict(self, seconds):
+        messages = sum(x[0] for x in self.topics.values())
+        rows = sum(self.rows.values())
+        return {
+            'seconds': round(seconds, 4),
+            'messages': messages,
+            'bytes': sum(x[1] for x in self.topics.values()),
+            'rows': rows,
+            'msgs_per_s': round(messages / seconds, 1) if seconds > 0 else 0.0,
+            'rows_per_s': round(rows / seconds, 1) if seconds > 0 else 0.0,
+            'stages': {stage: round(value, 4) for stage, value in self.stages.items()},
+            'topics': {topic: {'messages': x[0], 'bytes': x[1]} for topic, x in self.topics.items()},
+            'outputs': dict(self.rows),
+        }
+
+def get_task_stats():
+    return task_stats if task_stats is not None else TaskStats()
+
+class TimedWriter:
+    # topic writer wrapper booking its time and rows to a TaskStats, rows
+    # also counts what this writer got, to tell empty outputs apart
+    def __init__(self, writer, stats, key):
+        self.writer = writer
+        self.stats = stats
+        self.key = key
+        self.rows = 0
+
+    def write_rows(self, rows):
+        started = time.perf_counter()
+        self.writer.write_rows(rows)
+        self.rows += len(rows)
+        self.stats.wrote(self.key, len(rows), time.perf_counter() - started)
+
+    def write_columns(self, columns):
+        started = time.perf_counter()
+        self.writer.write_columns(columns)
+        self.rows += len(columns[0])
+        self.stats.wrote(self.key, len(columns[0]), time.perf_counter() - started)
+
+    def close(self):
+        started = time.perf_counter()
+        self.writer.close()
+        self.stats.wrote(self.key, 0, time.perf_counter() - started)
+
+    def discard(self):
+        self.writer.discard()
+
+def sum_stats(stats_list):
+    total = {'seconds': 0.0, 'messages': 0, 'bytes': 0, 'rows': 0,
+             'stages': dict.fromkeys(STAGES, 0.0), 'topics': {}}
+    for stats in stats_list:
+        for key in ('seconds', 'messages', 'bytes', 'rows'):
+            total[key] += stats[key]
+        for stage, value in stats['stages'].items():
+            total['stages'][stage] = total['stages'].get(stage, 0.0) + value
+        for topic, x in stats['topics'].items():
+            counts = total['topics'].setdefault(topic, {'messages': 0, 'bytes': 0})
+            counts['messages'] += x['messages']
+            counts['bytes'] += x['bytes']
+    total['seconds'] = round(total['seconds'], 4)
+    total['stages'] = {stage: round(value, 4) for stage, value in total['stages'].items()}
+    return total
+
+def format_stats(stats):
+    stages = ' '.join(f"{stage} {value:.2f}" for stage, value in stats['stages'].items())
+    rate = stats['rows'] / stats['seconds'] if stats['seconds'] > 0 else 0.0
+    return (f"{stats['messages']} msgs, {stats['bytes'] / (1 << 20):.1f} MB, {stats['rows']} rows "
+            f"in {stats['seconds']:.2f} s ({rate:.0f} rows/s) | {stages}")
+
+class Sampler:
+    # resample_hz keeps the first message of every 1/hz slot of bag time,
+    # slots aligned to t=0; decimate then keeps every n-th of those, counted
+    # per pass. A slot or a count can straddle a part boundary, which is why
+    # build_tasks never splits sampled keys. Kept rows keep their own time.
+    def __init__(self, decimate=None, resample_hz=None):
+        self.decimate = int(decimate or 1)
+        self.period = int(1e9 / resample_hz) if resample_hz else None
+        self.next_due = None
+        self.count = 0
+
+    def keep(self, t):
+        if self.period is not None:
+            if self.next_due is not None and t < self.next_due:
+                return False
+            self.next_due = (t // self.period + 1) * self.period
+        self.count += 1
+        return (self.count - 1) % self.decimate == 0
+
+def get_sampler(config):
+    if config.get('decimate', 1) in (None, 1) and not config.get('resample_hz'):
+        return None
+    return Sampler(config.get('decimate'), config.get('resample_hz'))
+
+def whole_bag_keys(cfg):
+    # keys whose output depends on reading the bag in one pass
+    return [key for key, config in cfg.items()
+            if get_sampler(config) is not None and not is_video_config(config)]
+
+def expand_config(cfg):
+    # a decimated/resampled entry with "full_rate": true also gets a
+    # <key>_full output at the recorded rate
+    expanded = {}
+    for key, config in cfg.items():
+        expanded[key] = config
+        if config.get('full_rate') and get_sampler(config) is not None:
+            expanded[key + '_full'] = {k: v for k, v in config.items()
+                                       if k not in ('decimate', 'resample_hz', 'full_rate')}
+    return expanded
+
+def is_video_config(config):
+    # image topics written to mp4 by videoExtract, not by the topic tasks
+    return 'video' in config
+
+def load_config(path):
+    with open(path) as f:
+        return expand_config(json.load(f))
+
+def get_nested_attr(obj, attr_path, ignore_first=True):
+    if obj is None:
+        return globals()[attr_path]
+    attrs = attr_path.split('.')
+    if ignore_first:
+        attrs = attrs[1:]
+    for attr in attrs:
+        obj = getattr(obj, attr)
+        if obj is None:
+            return None
+    return obj
+
+def compile_field(attr_path, ignore_first=True):
+    attrs = attr_path.split('.')
+    if ignore_first:
+        attrs = attrs[1:]
+    getter = operator.attrgetter('.'.join(attrs))
+    def get(obj):
+        try:
+            return getter(obj)
+        except AttributeError:
+            # a None somewhere along the path, keep get_nested_attr semantics
+            return get_nested_attr(obj, attr_path, ignore_first)
+    return get
+
+def compile_row_builder(config):
+    # Resolve the config field paths once per task; the returned builder maps
+    # (msg, t) to the list of rows for that message.
+    fields = config["fields"]
+    paths = ['.'.join(fld.split('.')[1:]) for fld in fields]
+    getter = operator.attrgetter(*paths)
+    single = len(paths) == 1
+
+    def build(obj, t):
+        try:
+            values = getter(obj)
+        except AttributeError:
+            return [t] + [get_nested_attr(obj, fld) for fld in fields]
+        if single:
+            return [t, values]
+        return [t, *values]
+
+    if "arrays" in config:
+        get_array = compile_field(config["arrays"]["field"])
+        return lambda msg, t: [build(attr, t) for attr in get_array(msg) or []]
+    return lambda msg, t: [build(msg, t)]
+
+def get_raw_batcher(reader, connections, config, writer, build_rows):
+    # Fast path for plain (non array) topics: decode the configured fields
+    # straight from the ROS1 message buffers when the layout allows it.
+    msgtypes = {x.msgtype for x in connections}
+    if reader.is2 or "arrays" in config or len(msgtypes) != 1:
+        return None
+    msgtype = msgtypes.pop()
+    plan = compile_raw_plan(reader.typestore, msgtype, config["fields"])
+    if plan is None:
+        return None
+    return RawBatcher(plan, writer, lambda raw, t: build_rows(reader.deserialize(raw, msgtype), t))
+
+def gen_csv_task(args):
+    worker_id, task, options, typestore = args
+    bag_name, bag_dir, target_dir, config, config_key = task
+
+    FORMAT = config.get('format', options['format'])
+    FILE_NAME = output_path(target_dir, bag_name, config_key, config, options)
+    BAG_NAME = os.path.join(bag_dir, bag_name)
+    WINDOW = get_window(options)
+    CONFIG_HASH = config_hash(config, FORMAT, WINDOW)
+
+    if not options['override'] and is_up_to_date(FILE_NAME, BAG_NAME, CONFIG_HASH):
+        return f"[Worker {worker_id}] Skipped {config_key} | {bag_name}"
+
+    try:
+        write_manifest(FILE_NAME, BAG_NAME, CONFIG_HASH, 0, complete=False)
+        with AnyReader([Path(BAG_NAME)], default_typestore=typestore) as reader:
+            connections = [x for x in reader.connections if x.topic == config['topic']]
+            if not connections:
+                write_manifest(FILE_NAME, BAG_NAME, CONFIG_HASH, 0)
+                remove_topic_variants(FILE_NAME)
+                return f"[Worker {worker_id}] Failed {config_key} | {bag_name} (No topic match)"
+
+            stats = get_task_stats()
+            build_rows = compile_row_builder(config)
+            writer = TimedWriter(open_topic_writer(FILE_NAME, config['cols'], FORMAT), stats, config_key)
+            try:
+                batcher = None
+                counter = ProgressCounter()
+                if options.get('fast_path'):
+                    batcher = get_raw_batcher(reader, connections, config, writer, build_rows)
+                start, stop = WINDOW or (None, None)
+                sampler = get_sampler(config)
+                stats.lap()
+                if batcher is not None:
+                    for c, t, raw_msg in reader.messages(connections=connections, start=start, stop=stop):
+                        counter.tick()
+                        stats.message(c.topic, len(raw_msg))
+                        if sampler is None or sampler.keep(t):
+                            batcher.add(t, raw_msg)
+                        stats.lap('format')
+                    batcher.flush()
+                    stats.lap('format')
+                else:
+                    for c, t, raw_msg in reader.messages(connections=connections, start=start, stop=stop):
+                        counter.tick()
+                        stats.message(c.topic, len(raw_msg))
+                        if sampler is not None and not sampler.keep(t):
+                            continue
+                        msg = reader.deserialize(raw_msg, c.msgtype)
+                        stats.lap('deserialize')
+                        writer.write_rows(build_rows(msg, t))
+                        stats.lap('format')
+                counter.flush()
+            except Exception:
+                writer.discard()
+                raise
+            writer.close()
+        write_manifest(FILE_NAME, BAG_NAME, CONFIG_HASH, counter.total, rows=writer.rows)
+        remove_topic_variants(FILE_NAME)
+
+        if writer.rows > 0:
+            return f"[Worker {worker_id}] Completed {config_key} | {bag_name}"
+        else:
+            os.remove(FILE_NAME)
+            return f"[Worker {worker_id}] Failed {config_key} | {bag_name} (Empty)"
+    except Exception as e:
+        return f"[Worker {worker_id}] Error {config_key} | {bag_name}: {e}"
+
+def output_path(target_dir, bag_name, config_key, config, options):
+    # per key 'format' / 'codec' entries override the run options
+    return topic_path(target_dir, bag_name, config_key, config.get('format', options['format']),
+                      config.get('codec', options.get('codec', 'none')))
+
+def get_window(options):
+    # optional (start, stop) time window of the extraction, bag time in ns
+    start, stop = options.get('start'), options.get('stop')
+    if start is None and stop is None:
+        return None
+    return start, stop
+
+def parse_time(text, relative=False):
+    # '' -> None. Relative times are seconds, absolute ones bag time in
+    # seconds or nanoseconds; the result is nanoseconds either way.
+    text = text.strip()
+    if not text:
+        return None
+    try:
+        value = Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f"Invalid time: {text}")
+    if relative or abs(value) < 10**12:
+        value *= 10**9
+    return int(value)
+
+def resolve_window(options, catalog):
+    # 'relative' windows count from the start of the earliest bag of the job
+    if not options.get('relative') or get_window(options) is None:
+        return options
+    starts = [entry['start'] for entry in catalog.values() if entry and entry['start'] is not None]
+    if not starts:
+        raise ValueError("Relative window needs the bag start time, no readable bag found")
+    resolved = dict(options, relative=False)
+    for key in ('start', 'stop'):
+        if options.get(key) is not None:
+            resolved[key] = min(starts) + options[key]
+    return resolved
+
+def overlaps_window(entry, window):
+    if window is None or entry is None or entry['start'] is None:
+        return True
+    start, stop = window
+    return (start is None or entry['end'] >= start) and (stop is None or entry['start'] < stop)
+
+def intersect_window(a, b):
+    start = max([x for x in (a[0], b[0]) if x is not None], default=None)
+    stop = min([x for x in (a[1], b[1]) if x is not None], default=None)
+    return start, stop
+
+def get_part_window(reader, part, window=None):
+    # Split the bag (or the extraction window of it) into time windows
+    # holding roughly the same number of chunks; windows partition time, so
+    # every message lands in exactly one.
+    part_id, n_parts = part
+    first, last = intersect_window((reader.start_time, reader.end_time), window or (None, None))
+    starts = sorted(x.start_time for r in reader.readers for x in getattr(r, 'chunk_infos', [])
+                    if first <= x.start_time < last)
+    if len(starts) >= n_parts:
+        bounds = [starts[len(starts) * i // n_parts] for i in range(n_parts)]
+    else:
+        step = max(last - first, 0) / n_parts
+        bounds = [int(first + step * i) for i in range(n_parts)]
+    bounds = [None] + bounds[1:] + [None]
+    return bounds[part_id], bounds[part_id + 1]
+
+def gen_bag_task(args):
+    # One pass over the bag for every topic in the config: each chunk is
+    # decompressed and each message deserialized once, then demultiplexed
+    # to the writers of all config keys that share its topic. With a part
+    # (part_id, n_parts) only that time window of the bag is extracted.
+    worker_id, task, options, typestore = args
+    bag_name, bag_dir, target_dir, cfg, part = task
+
+    BAG_NAME = os.path.join(bag_dir, bag_name)
+    WINDOW = get_window(options)
+    results = []
+    pending = {}
+    hashes = {}
+    for config_key in cfg:
+        FORMAT = cfg[config_key].get('format', options['format'])
+        FILE_NAME = output_path(target_dir, bag_name, config_key, cfg[config_key], options)
+        hashes[config_key] = config_hash(cfg[config_key], FORMAT, WINDOW)
+        if not options['override'] and is_up_to_date(FILE_NAME, BAG_NAME, hashes[config_key]):
+            results.append(f"[Worker {worker_id}] Skipped {config_key} | {bag_name}")
+            continue
+        pending[config_key] = FILE_NAME if part is None else part_path(FILE_NAME, part[0])
+    if part is not None:
+        bag_name = f"{bag_name} (part {part[0] + 1}/{part[1]})"
+    if not pending:
+        return results
+
+    writers = {}
+    finished = set()
+    topic_counts = {}
+    stats = get_task_stats()
+    try:
+        for config_key in pending:
+            write_manifest(pending[config_key], BAG_NAME, hashes[config_key], 0, complete=False)
+        with AnyReader([Path(BAG_NAME)], default_typestore=typestore) as reader:
+            bag_topics = {x.topic for x in reader.connections}
+            routes = {}
+            builders = {}
+            batchers = {}
+            samplers = {}
+            for config_key in pending:
+                topic = cfg[config_key]['topic']
+                if topic not in bag_topics:
+                    write_manifest(pending[config_key], BAG_NAME, hashes[config_key], 0)
+                    if part is None:
+                        remove_topic_variants(pending[config_key])
+                    results.append(f"[Worker {worker_id}] Failed {config_key} | {bag_name} (No topic match)")
+                    finished.add(config_key)
+                    continue
+                routes.setdefault(topic, []).append(config_key)
+                topic_counts[topic] = 0
+                builders[config_key] = compile_row_builder(cfg[config_key])
+                samplers[config_key] = get_sampler(cfg[config_key])
+                writers[config_key] = TimedWriter(open_topic_writer(pending[config_key], cfg[config_key]['cols'],
+                                                                    cfg[config_key].get('format', options['format'])),
+                                                  stats, config_key)
+
+            connections = [x for x in reader.connections if x.topic in routes]
+            start, stop = get_part_window(reader, part, WINDOW) if part is not None else (None, None)
+            if WINDOW is not None:
+                start, stop = intersect_window((start, stop), WINDOW)
+            if options.get('fast_path'):
+                for topic, keys in routes.items():
+                    topic_connections = [x for x in connections if x.topic == topic]
+                    for config_key in keys:
+                        batcher = get_raw_batcher(reader, topic_connections, cfg[config_key],
+                                                  writers[config_key], builders[config_key])
+                        if batcher is not None:
+                            batchers[config_key] = batcher
+            if connections:
+                counter = ProgressCounter()
+                stats.lap()
+                for c, t, raw_msg in reader.messages(connections=connections, start=start, stop=stop):
+                    counter.tick()
+                    stats.message(c.topic, len(raw_msg))
+                    topic_counts[c.topic] += 1
+                    msg = None
+                    for config_key in routes[c.topic]:
+                        if samplers[config_key] is not None and not samplers[config_key].keep(t):
+                            continue
+                        if config_key in batchers:
+                            batchers[config_key].add(t, raw_msg)
+                            stats.lap('format')
+                            continue
+                        if msg is None:
+                            msg = reader.deserialize(raw_msg, c.msgtype)
+                            stats.lap('deserialize')
+                        writers[config_key].write_rows(builders[config_key](msg, t))
+                        stats.lap('format')
+                for batcher in batchers.values():
+                    batcher.flush()
+                stats.lap('format')
+                counter.flush()
+
+        for config_key in list(writers):
+            # a writer leaves the dict once its output is in place; empty
+            # parts are kept so merge_bag_parts finds every part
+            rows = writers[config_key].rows
+            writers[config_key].close()
+            del writers[config_key]
+            write_manifest(pending[config_key], BAG_NAME, hashes[config_key],
+                           topic_counts[cfg[config_key]['topic']], rows=rows)
+            if part is None:
+                remove_topic_variants(pending[config_key])
+            if rows > 0 or part is not None:
+                results.append(f"[Worker {worker_id}] Completed {config_key} | {bag_name}")
+            else:
+                os.remove(pending[config_key])
+                results.append(f"[Worker {worker_id}] Failed {config_key} | {bag_name} (Empty)")
+            finished.add(config_key)
+    except Exception as e:
+        for writer in writers.values():
+            writer.discard()
+        return results + [f"[Worker {worker_id}] Error {config_key} | {bag_name}: {e}"
+                          for config_key in pending if config_key not in finished]
+    return results
+
+
+
+def merge_bag_parts(bag_name, bag_dir, target_dir, cfg, options, n_parts):
+    # The final output and its manifest only appear once every part of the
+    # bag finished; the part manifests carry the message and row counts.
+    # Parts adding up to no rows leave no output, like an unsplit run.
+    results = []
+    BAG_NAME = os.path.join(bag_dir, bag_name)
+    for config_key in cfg:
+        FORMAT = cfg[config_key].get('format', options['format'])
+        FILE_NAME = output_path(target_dir, bag_name, config_key, cfg[config_key], options)
+        parts = [part_path(FILE_NAME, part_id) for part_id in range(n_parts)]
+        manifests = [read_manifest(x) for x in parts]
+        if not any(manifests):
+            continue
+        if all(m is not None and m['complete'] for m in manifests):
+            msg_count = sum(m['messages'] for m in manifests)
+            rows = [m.get('rows') for m in manifests]
+            rows = None if None in rows else sum(rows)
+            found = [x for x in parts if os.path.exists(x)]
+            if rows == 0:
+                if os.path.exists(FILE_NAME):
+                    os.remove(FILE_NAME)
+                results.append(f"Failed {config_key} | {bag_name} (Empty)")
+            elif len(found) == n_parts:
+                merge_topic_files(parts, FILE_NAME)
+                results.append(f"Merged {config_key} | {bag_name} ({n_parts} parts)")
+            write_manifest(FILE_NAME, BAG_NAME, config_hash(cfg[config_key], FORMAT, get_window(options)), msg_count,
+                           rows=rows)
+            remove_topic_variants(FILE_NAME)
+        else:
+            results.append(f"Failed {config_key} | {bag_name} (Missing parts)")
+        for x in parts:
+            if os.path.exists(x):
+                os.remove(x)
+            remove_manifest(x)
+    return results
+
+
+
+def run_task(args):
+    global task_stats
+    index, task_func, task_args = args
+    task_stats = TaskStats()
+    started = time.time()
+    try:
+        result = task_func(task_args)
+    except Exception as e:
+        # one Error line per key the task owned, so the run keeps going
+        worker_id, task = task_args[:2]
+        bag_name = ', '.join(task[0]) if isinstance(task[0], tuple) else task[0]
+        keys = list(task[3]) if task_func is gen_bag_task else [task[4]]
+        result = [f"[Worker {worker_id}] Error {config_key} | {bag_name}: {e}" for config_key in keys]
+    if isinstance(result, str):
+        result = [result]
+    elapsed = time.time() - started
+    stats = task_stats.to_dict(elapsed)
+    task_stats = None
+    return index, result, elapsed, stats
+
+def task_entry(task_func, task, elapsed, result, stats=None):
+    # one record of the run log; video tasks (videoExtract) carry a tuple of bags
+    entry = {'bag_dir': task[1], 'bag': list(task[0]) if isinstance(task[0], tuple) else task[0]}
+    if task_func is gen_csv_task or isinstance(task[0], tuple):
+        entry['key'] = task[4]
+    elif task[4] is not None:
+        entry['part'] = list(task[4])
+    entry['seconds'] = round(elapsed, 3)
+    entry['results'] = result
+    if stats is not None:
+        entry['stats'] = stats
+    return entry
+
+RUN_LOG = 'extraction_log.jsonl'
+
+def append_run_log(bag_dir, record):
+    # one JSON document per line and run, next to the csv folder
+    try:
+        with open(os.path.join(bag_dir, RUN_LOG), 'a') as f:
+            f.write(json.dumps(record) + '\n')
+    except OSError:
+        pass
+
+def build_tasks(bag_dir, bag_list, cfg, processors, single_pass=True, split_bags=False, catalog=None,
+                window=None):
+    # Returns the task function, its tasks, the number of report lines they
+    # produce and how many parts each bag is split into. With a bag catalog
+    # config keys whose topic is not recorded in a bag are left out, and so
+    # are bags outside the extraction window. Video keys get their own tasks,
+    # and split bags still get one whole-bag task for their sampled keys.
+    tasks = []
+    n_parts = 1
+    target_dir = os.path.join(bag_dir, 'csv')
+    cfg = {key: config for key, config in cfg.items() if not is_video_config(config)}
+    bag_cfg = {}
+    for bag_name in bag_list:
+        entry = catalog.get(bag_name) if catalog else None
+        if not overlaps_window(entry, window):
+            bag_cfg[bag_name] = {}
+        elif entry is None:
+            bag_cfg[bag_name] = cfg
+        else:
+            bag_cfg[bag_name] = {key: cfg[key] for key in cfg if cfg[key]['topic'] in entry['topics']}
+    if single_pass:
+        task_func = gen_bag_task
+        if split_bags:
+            n_parts = -(-processors // max(sum(1 for bag_name in bag_list if bag_cfg[bag_name]), 1))
+        total = 0
+        for bag_name in bag_list:
+            split_cfg = bag_cfg[bag_name]
+            if n_parts > 1:
+                whole = {key: split_cfg[key] for key in whole_bag_keys(split_cfg)}
+                split_cfg = {key: config for key, config in split_cfg.items() if key not in whole}
+                if whole:
+                    tasks.append((bag_name, bag_dir, target_dir, whole, None))
+                    total += len(whole)
+            if not split_cfg:
+                continue
+            for part_id in range(n_parts):
+                part = (part_id, n_parts) if n_parts > 1 else None
+                tasks.append((bag_name, bag_dir, target_dir, split_cfg, part))
+                total += len(split_cfg)
+    else:
+        task_func = gen_csv_task
+        for bag_name in bag_list:
+            for config_key in bag_cfg[bag_name]:
+                tasks.append((bag_name, bag_dir, target_dir, cfg[config_key], config_key))
+        total = len(tasks)
+    return task_func, tasks, total, n_parts
+
+def task_outputs(task_func, task, options):
+    if task_func is gen_csv_task:
+        bag_name, _, target_dir, config, config_key = task
+        return [output_path(target_dir, bag_name, config_key, config, options)]
+    bag_name, _, target_dir, cfg, part = task
+    outputs = []
+    for config_key in cfg:
+        FILE_NAME = output_path(target_dir, bag_name, config_key, cfg[config_key], options)
+        outputs.append(FILE_NAME if part is None else part_path(FILE_NAME, part[0]))
+    return outputs
+
+def clean_up(task_func, tasks, unfinished, options):
+    # outputs are only renamed into place once complete, so a killed task
+    # leaves temp files, part files and incomplete manifests behind
+    removed = 0
+    for index in unfinished:
+        is_part = task_func is gen_bag_task and tasks[index][4] is not None
+        for path in task_outputs(task_func, tasks[index], options):
+            manifest = read_manifest(path)
+            stale = [tmp_path(path)] + ([path] if is_part else [])
+            for x in stale:
+                if os.path.exists(x):
+                    os.remove(x)
+                    removed += 1
+            if is_part or (manifest is not None and not manifest['complete']):
+                remove_manifest(path)
+    return removed
@@ -3,11 +3,10 @@ if sys.version_info < (3, 10):
     raise Exception("Python 3.10 or newer required")
 import os
 import json
-from rosbags.highlevel import AnyReader
 from rosbags.typesys import Stores, get_typestore
-from pathlib import Path
 from itertools import cycle
 import multiprocessing as mp
+import time
 
 from PyQt5 import QtCore, QtGui, QtWidgets
 from PyQt5.QtWidgets import (
@@ -15,11 +14,19 @@ from PyQt5.QtWidgets import (
     QHBoxLayout, QWidget, QSlider, QFileDialog, QDialog,
     QStackedWidget, QListWidgetItem, QMessageBox
 )
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal
 from PyQt5.QtGui import QPixmap, QImage
 from PyQt5.QtCore import QObject, pyqtSlot, QUrl
 
 from pages.bag_to_csv import Ui_Form
+from pages.topicIO import TOPIC_FORMATS, CODECS
+from pages.bagCatalog import load_catalog, config_keys, describe_topic
+from pages.bagExtract import (
+    merge_bag_parts, init_worker, run_task, build_tasks, clean_up, load_config,
+    parse_time, resolve_window, get_window, task_entry, sum_stats, format_stats, append_run_log, RUN_LOG,
+    whole_bag_keys
+)
+from pages.videoExtract import gen_video_task, build_video_tasks, clean_up_video
 
 
 
@@ -28,66 +35,135 @@ file_path = os.path.abspath(__file__)
 dir_path = os.path.dirname(file_path)
 dir_path = os.path.dirname(dir_path)
 
-def get_nested_attr(obj, attr_path, ignore_first=True):
-    if obj is None:
-        return globals()[attr_path]
-    attrs = attr_path.split('.')
-    if ignore_first:
-        attrs = attrs[1:]
-    for attr in attrs:
-        obj = getattr(obj, attr)
-        if obj is None:
-            return None
-    return obj
-
-def gen_csv_task(args):
-    worker_id, task, override_flag, typestore = args
-    bag_name, bag_dir, target_dir, config, config_key = task
-
-    FILE_NAME = os.path.join(target_dir, f"{bag_name}.{config_key}")
-    BAG_NAME = os.path.join(bag_dir, bag_name)
-
-    try:
-        if os.path.getsize(FILE_NAME) > 0 and (not override_flag):
-            return f"[Worker {worker_id}] Skipped {config_key} | {bag_name}"
-    except:
-        pass
-
-    try:
-        with open(FILE_NAME, 'w') as f, AnyReader([Path(BAG_NAME)], default_typestore=typestore) as reader:
-            connections = [x for x in reader.connections if x.topic == config['topic']]
-            if not connections:
-                return f"[Worker {worker_id}] Failed {config_key} | {bag_name} (No topic match)"
-
-            f.write('time,' + ','.join(config['cols']) + '\n')
-            if "arrays" in config:
-                for c, t, raw_msg in reader.messages(connections=connections):
-                    msg = reader.deserialize(raw_msg, c.msgtype)
-                    for attr in get_nested_attr(msg, config["arrays"]["field"]) or []:
-                        row = [get_nested_attr(attr, fld) for fld in config["fields"]]
-                        row.insert(0, t)
-                        f.write(','.join(str(i) for i in row) + '\n')
-            else:
-                for c, t, raw_msg in reader.messages(connections=connections):
-                    msg = reader.deserialize(raw_msg, c.msgtype)
-                    row = [get_nested_attr(msg, fld) for fld in config["fields"]]
-                    f.write(f'{t},' + ','.join(str(i) for i in row) + '\n')
-
-        if os.path.getsize(FILE_NAME) > 0:
-            return f"[Worker {worker_id}] Completed {config_key} | {bag_name}"
-        else:
-            os.remove(FILE_NAME)
-            return f"[Worker {worker_id}] Failed {config_key} | {bag_name} (Empty)"
-    except Exception as e:
-        return f"[Worker {worker_id}] Error {config_key} | {bag_name}: {e}"
+
+class ExtractionJob(QThread):
+    # Runs the worker pool off the GUI thread. Report lines, (done, total)
+    # progress and (messages, msgs/s) are streamed back through signals;
+    # cancel() stops the pool and removes the outputs of unfinished tasks.
+    message = pyqtSignal(str)
+    progress = pyqtSignal(int, int)
+    rate = pyqtSignal(int, float)
+    typestore = get_typestore(Stores.ROS1_NOETIC)
+
+    def __init__(self, bag_dir, bag_list, cfg, options, processors=None,
+                 single_pass=True, split_bags=False, parent=None):
+        super(ExtractionJob, self).__init__(parent)
+        self.bag_dir = bag_dir
+        self.target_dir = os.path.join(bag_dir, 'csv')
+        self.bag_list = [os.path.basename(bag) for bag in bag_list]
+        self.cfg = cfg
+        self.options = options
+        self.processors = processors or mp.cpu_count()
+        self.single_pass = single_pass
+        self.split_bags = split_bags
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        os.makedirs(self.target_dir, exist_ok=True)
+        self.message.emit(f"Using bag folder: {self.bag_dir}")
+        self.message.emit(f"Using target directory: {self.target_dir}")
+        catalog = load_catalog([os.path.join(self.bag_dir, bag) for bag in self.bag_list])
+        try:
+            self.options = resolve_window(self.options, catalog)
+        except ValueError as e:
+            self.message.emit(str(e))
+            return
+        window = get_window(self.options)
+        if window is not None:
+            self.message.emit(f"Time window: {window[0]} - {window[1]}")
+        task_func, tasks, total, n_parts = build_tasks(self.bag_dir, self.bag_list, self.cfg, self.processors,
+                                                       self.single_pass, self.split_bags, catalog, window)
+        if n_parts > 1 and whole_bag_keys(self.cfg):
+            self.message.emit(f"Not splitting sampled keys: {', '.join(whole_bag_keys(self.cfg))}")
+        video_tasks = build_video_tasks(self.bag_dir, self.bag_list, self.cfg, catalog, window)
+        total += len(video_tasks)
+        self.message.emit(f"Number of tasks: {len(tasks) + len(video_tasks)}")
+        self.progress.emit(0, total)
+
+        # videos first, they are the longest tasks
+        jobs = [(gen_video_task, task) for task in video_tasks] + [(task_func, task) for task in tasks]
+        task_queue = [
+            (index, func, (worker_id, task, self.options, self.typestore))
+            for index, (worker_id, (func, task)) in enumerate(zip(cycle(range(self.processors)), jobs))
+        ]
+        unfinished = set(range(len(jobs)))
+        entries = []
+        done = 0
+        msgs = 0
+        queue = mp.Queue()
+        started = time.time()
+        last_time, last_msgs = started, 0
+        with mp.Pool(self.processors, initializer=init_worker, initargs=(queue,)) as pool:
+            results = pool.imap_unordered(run_task, task_queue)
+            while unfinished and not self.cancelled:
+                try:
+                    index, result, elapsed, stats = results.next(timeout=0.2)
+                except mp.TimeoutError:
+                    pass
+                else:
+                    unfinished.discard(index)
+                    entries.append(task_entry(*jobs[index], elapsed, result, stats))
+                    for line in result:
+                        self.message.emit(line)
+                    if stats['messages']:
+                        self.message.emit("    " + format_stats(stats))
+                    done += len(result)
+                    self.progress.emit(done, total)
+                while not queue.empty():
+                    msgs += queue.get()
+                now = time.time()
+                if now - last_time >= 0.5 or not unfinished:
+                    self.rate.emit(msgs, (msgs - last_msgs) / max(now - last_time, 1e-6))
+                    last_time, last_msgs = now, msgs
+            if self.cancelled:
+                pool.terminate()
+        queue.close()
+        queue.cancel_join_thread()
+
+        if self.cancelled:
+            removed = clean_up_video(video_tasks, [i for i in unfinished if i < len(video_tasks)], self.options)
+            removed += clean_up(task_func, tasks, [i - len(video_tasks) for i in unfinished if i >= len(video_tasks)],
+                                self.options)
+            self.message.emit(f"Cancelled, {len(unfinished)} tasks not finished, {removed} partial files removed.")
+            self.log_run(started, entries)
+            return
+        if n_parts > 1:
+            for bag_name in self.bag_list:
+                for line in merge_bag_parts(bag_name, self.bag_dir, self.target_dir, self.cfg, self.options, n_parts):
+                    self.message.emit(line)
+        elapsed = time.time() - started
+        self.message.emit(f"All tasks completed. {msgs} messages in {elapsed:.1f} s ({msgs / max(elapsed, 1e-6):.0f} msgs/s)")
+        totals = self.log_run(started, entries)
+        self.message.emit("Task totals: " + format_stats(totals))
+
+    def log_run(self, started, entries):
+        totals = sum_stats([entry['stats'] for entry in entries])
+        append_run_log(self.bag_dir, {
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(started)),
+            'seconds': round(time.time() - started, 3),
+            'bags': self.bag_list,
+            'options': self.options,
+            'processors': self.processors,
+            'single_pass': self.single_pass,
+            'split_bags': self.split_bags,
+            'cancelled': self.cancelled,
+            'totals': totals,
+            'tasks': entries,
+        })
+        self.message.emit(f"Run log appended to {os.path.join(self.bag_dir, RUN_LOG)}")
+        return totals
 
 
 
 class BagToCsvApp(QtWidgets.QWidget, Ui_Form):
     default_config_path = os.path.join(dir_path, 'config.json')
-    typestore = get_typestore(Stores.ROS1_NOETIC)
+    typestore = ExtractionJob.typestore
     def __init__(self, parent=None):
         super(BagToCsvApp, self).__init__(parent)
+        self.job = None
         self.setupUi(self)
         self.adjustUI()
         self.WARN_BAG = True
@@ -96,6 +172,9 @@ class BagToCsvApp(QtWidgets.QWidget, Ui_Form):
 
     def adjustUI(self):
         self.override.setChecked(True)
+        self.singlePass.setChecked(True)
+        self.outFormat.addItems(TOPIC_FORMATS)
+        self.codec.addItems(CODECS)
         self.progressBar.setValue(0)
         self.progressBar.setEnabled(False)
         self.config.addItem(self.default_config_path)
@@ -107,16 +186,46 @@ class BagToCsvApp(QtWidgets.QWidget, Ui_Form):
         self.closeB.clicked.connect(self.process)
         self.closeB.setText('Process')
         self.closeB.setEnabled(False)
+        self.cancelB.clicked.connect(self.cancel)
+        self.cancelB.setEnabled(False)
 
         self.check_config()
     
     def open_bags(self):
-        self.bagList.clear()
         file_path, _ = QFileDialog.getOpenFileNames(self, 'Open bag files', filter='*.bag')
+        if file_path:
+            self.set_bags(file_path)
+
+    def set_bags(self, file_path):
+        self.bagList.clear()
         self.bagList.addItems(file_path)
         self.DIR = os.path.dirname(file_path[0])
         self.closeB.setEnabled(True)
         self.closeB.setText('Process')
+        self.preview_bags()
+
+    def preview_bags(self):
+        # topics, counts and rates come from the bag index, nothing is extracted
+        if self.bagList.count() == 0:
+            return
+        self.reportList.clear()
+        bag_list = [self.bagList.item(i).text() for i in range(self.bagList.count())]
+        catalog = load_catalog(bag_list)
+        for i, bag in enumerate(bag_list):
+            entry = catalog.get(os.path.basename(bag))
+            if entry is None:
+                self.reportList.addItem(f"{os.path.basename(bag)}: unreadable")
+                continue
+            self.bagList.item(i).setToolTip('\n'.join(
+                f"{topic}: {describe_topic(info)}" for topic, info in sorted(entry['topics'].items())))
+            line = f"{os.path.basename(bag)}: {entry['duration']:.1f} s, {entry['messages']} msgs"
+            if self.cfg is not None:
+                keys = config_keys(entry, self.cfg)
+                missing = [key for key in self.cfg if key not in keys]
+                line += f", {len(keys)}/{len(self.cfg)} config topics"
+                if missing:
+                    line += f" (missing: {', '.join(missing)})"
+            self.reportList.addItem(line)
 
     def open_config(self):
         self.config.clear()
@@ -126,6 +235,7 @@ class BagToCsvApp(QtWidgets.QWidget, Ui_Form):
         if self.cfg is not None:
             self.closeB.setEnabled(True)
             self.closeB.setText('Process')
+            self.preview_bags()
         else:
             self.closeB.setEnabled(False)
             self.showWarning("Invalid config file", True)
@@ -146,8 +256,7 @@ class BagToCsvApp(QtWidgets.QWidget, Ui_Form):
     
     def check_config(self):
         try:
-            with open(self.config.item(0).text()) as json_data_file:
-                self.cfg = json.load(json_data_file)
+            self.cfg = load_config(self.config.item(0).text())
         except:
             self.cfg = None
 
@@ -159,42 +268,59 @@ class BagToCsvApp(QtWidgets.QWidget, Ui_Form):
             self.WARN_CONFIG = self.showWarning("No config file selected", self.WARN_CONFIG)
             return
 
+        relative = self.windowRelative.isChecked()
+        try:
+            start = parse_time(self.windowStart.text(), relative)
+            stop = parse_time(self.windowEnd.text(), relative)
+        except ValueError as e:
+            self.showWarning(str(e), True)
+            return
+
         self.reportList.clear()
         self.progressBar.setValue(0)
         self.progressBar.setEnabled(True)
         self.closeB.setEnabled(False)
-
-        if not os.path.exists(os.path.join(self.DIR, 'csv')):
-            os.makedirs(os.path.join(self.DIR, 'csv'))
-        TARGET_DIR = os.path.join(self.DIR, 'csv')
-        self.reportList.addItem(f"Using bag folder: {self.DIR}")
-        self.reportList.addItem(f"Using target directory: {TARGET_DIR}")
+        self.cancelB.setEnabled(True)
 
         bag_list = [self.bagList.item(i).text() for i in range(self.bagList.count())]
-        bag_list = [os.path.basename(bag) for bag in bag_list]
-        tasks = []
-        for bag_name in bag_list:
-            for config_key in self.cfg:
-                tasks.append((bag_name, self.DIR, TARGET_DIR, self.cfg[config_key], config_key))
-
-        self.reportList.addItem(f"Number of tasks: {len(tasks)}")
-
-        total_tasks = len(tasks)
-        self.progressBar.setMaximum(total_tasks)
-
-        task_queue = [
-            (worker_id, task, self.override.isChecked(), self.typestore)
-            for worker_id, task in zip(cycle(range(self.processors.value())), tasks)
-        ]
-
-        with mp.Pool(self.processors.value()) as pool:
-            for i, result in enumerate(pool.imap_unordered(gen_csv_task, task_queue), 1):
-                if result:
-                    self.reportList.addItem(result)
-                self.progressBar.setValue(i)
-
-        self.reportList.addItem("All tasks completed.")
+        options = {'override': self.override.isChecked(),
+                   'format': self.outFormat.currentText(),
+                   'codec': self.codec.currentText(),
+                   'fast_path': self.fastPath.isChecked(),
+                   'start': start, 'stop': stop, 'relative': relative}
+        self.job = ExtractionJob(self.DIR, bag_list, self.cfg, options,
+                                 processors=self.processors.value(),
+                                 single_pass=self.singlePass.isChecked(),
+                                 split_bags=self.splitBags.isChecked())
+        self.job.message.connect(self.reportList.addItem)
+        self.job.progress.connect(self.update_progress)
+        self.job.rate.connect(self.update_rate)
+        self.job.finished.connect(self.job_finished)
+        self.job.start()
+
+    def cancel(self):
+        if self.job is not None and self.job.isRunning():
+            self.cancelB.setEnabled(False)
+            self.reportList.addItem("Cancelling...")
+            self.job.cancel()
+
+    def update_progress(self, done, total):
+        self.progressBar.setMaximum(total)
+        self.progressBar.setValue(done)
+
+    def update_rate(self, msgs, rate):
+        self.rateLabel.setText(f"{msgs} msgs | {rate:.0f} msgs/s")
+
+    def job_finished(self):
         self.closeB.setEnabled(True)
+        self.cancelB.setEnabled(False)
+        self.reportList.scrollToBottom()
+
+    def closeEvent(self, event):
+        if self.job is not None and self.job.isRunning():
+            self.job.cancel()
+            self.job.wait()
+        event.accept()
 
 
 
@@ -58,12 +58,51 @@ class Ui_Form(object):
         self.processors.setMaximum(20)
         self.processors.setObjectName("processors")
         self.horizontalLayout.addWidget(self.processors)
+        self.label_5 = QtWidgets.QLabel(Form)
+        self.label_5.setObjectName("label_5")
+        self.horizontalLayout.addWidget(self.label_5)
+        self.outFormat = QtWidgets.QComboBox(Form)
+        self.outFormat.setObjectName("outFormat")
+        self.horizontalLayout.addWidget(self.outFormat)
+        self.label_codec = QtWidgets.QLabel(Form)
+        self.label_codec.setObjectName("label_codec")
+        self.horizontalLayout.addWidget(self.label_codec)
+        self.codec = QtWidgets.QComboBox(Form)
+        self.codec.setObjectName("codec")
+        self.horizontalLayout.addWidget(self.codec)
         spacerItem1 = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
         self.horizontalLayout.addItem(spacerItem1)
+        self.fastPath = QtWidgets.QCheckBox(Form)
+        self.fastPath.setObjectName("fastPath")
+        self.horizontalLayout.addWidget(self.fastPath)
+        self.singlePass = QtWidgets.QCheckBox(Form)
+        self.singlePass.setObjectName("singlePass")
+        self.horizontalLayout.addWidget(self.singlePass)
+        self.splitBags = QtWidgets.QCheckBox(Form)
+        self.splitBags.setObjectName("splitBags")
+        self.horizontalLayout.addWidget(self.splitBags)
         self.override = QtWidgets.QCheckBox(Form)
         self.override.setObjectName("override")
         self.horizontalLayout.addWidget(self.override)
         self.verticalLayout_2.addLayout(self.horizontalLayout)
+        self.horizontalLayout_5 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_5.setObjectName("horizontalLayout_5")
+        self.label_6 = QtWidgets.QLabel(Form)
+        self.label_6.setObjectName("label_6")
+        self.horizontalLayout_5.addWidget(self.label_6)
+        self.windowStart = QtWidgets.QLineEdit(Form)
+        self.windowStart.setObjectName("windowStart")
+        self.horizontalLayout_5.addWidget(self.windowStart)
+        self.label_7 = QtWidgets.QLabel(Form)
+        self.label_7.setObjectName("label_7")
+        self.horizontalLayout_5.addWidget(self.label_7)
+        self.windowEnd = QtWidgets.QLineEdit(Form)
+        self.windowEnd.setObjectName("windowEnd")
+        self.horizontalLayout_5.addWidget(self.windowEnd)
+        self.windowRelative = QtWidgets.QCheckBox(Form)
+        self.windowRelative.setObjectName("windowRelative")
+        self.horizontalLayout_5.addWidget(self.windowRelative)
+        self.verticalLayout_2.addLayout(self.horizontalLayout_5)
         self.label_4 = QtWidgets.QLabel(Form)
         self.label_4.setObjectName("label_4")
         self.verticalLayout_2.addWidget(self.label_4)
@@ -76,6 +115,13 @@ class Ui_Form(object):
         self.progressBar.setProperty("value", 24)
         self.progressBar.setObjectName("progressBar")
         self.horizontalLayout_4.addWidget(self.progressBar)
+        self.rateLabel = QtWidgets.QLabel(Form)
+        self.rateLabel.setText("")
+        self.rateLabel.setObjectName("rateLabel")
+        self.horizontalLayout_4.addWidget(self.rateLabel)
+        self.cancelB = QtWidgets.QPushButton(Form)
+        self.cancelB.setObjectName("cancelB")
+        self.horizontalLayout_4.addWidget(self.cancelB)
         self.closeB = QtWidgets.QPushButton(Form)
         self.closeB.setObjectName("closeB")
         self.horizontalLayout_4.addWidget(self.closeB)
@@ -92,8 +138,19 @@ class Ui_Form(object):
         self.label_3.setText(_translate("Form", "Select Config File:"))
         self.openConfB.setText(_translate("Form", "Browse"))
         self.label.setText(_translate("Form", "Number of parallel processors:"))
+        self.label_5.setText(_translate("Form", "Output format:"))
+        self.label_codec.setText(_translate("Form", "Compression:"))
+        self.fastPath.setText(_translate("Form", "Raw fast path"))
+        self.singlePass.setText(_translate("Form", "One pass per bag"))
+        self.splitBags.setText(_translate("Form", "Split bags across workers"))
         self.override.setText(_translate("Form", "Override"))
+        self.label_6.setText(_translate("Form", "Window start:"))
+        self.windowStart.setPlaceholderText(_translate("Form", "bag start"))
+        self.label_7.setText(_translate("Form", "end:"))
+        self.windowEnd.setPlaceholderText(_translate("Form", "bag end"))
+        self.windowRelative.setText(_translate("Form", "Seconds from drive start"))
         self.label_4.setText(_translate("Form", "Report"))
+        self.cancelB.setText(_translate("Form", "Cancel"))
         self.closeB.setText(_translate("Form", "Close"))
 
 
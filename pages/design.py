@@ -378,7 +378,10 @@ class Ui_MainWindow(object):
         self.actionGenerate_Report.setObjectName("actionGenerate_Report")
         self.actionTTC_Tool = QtWidgets.QAction(MainWindow)
         self.actionTTC_Tool.setObjectName("actionTTC_Tool")
+        self.actionTrip_Catalog = QtWidgets.QAction(MainWindow)
+        self.actionTrip_Catalog.setObjectName("actionTrip_Catalog")
         self.menuFile.addAction(self.actionOpen)
+        self.menuFile.addAction(self.actionTrip_Catalog)
         self.menuFile.addAction(self.actionSave)
         self.menuFile.addAction(self.actionSave_As)
         self.menuFile.addAction(self.actionGenerate_Report)
@@ -454,6 +457,7 @@ class Ui_MainWindow(object):
         self.actionScenario_Detection.setText(_translate("MainWindow", "&Scenario Detection"))
         self.actionGenerate_Report.setText(_translate("MainWindow", "&Generate Report"))
         self.actionTTC_Tool.setText(_translate("MainWindow", "Time To Collision Calc."))
+        self.actionTrip_Catalog.setText(_translate("MainWindow", "Trip &Catalog"))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,58 @@
+import os
+from rosbags.typesys import Stores, get_typestore
+
+from pages.topicIO import (
+    topic_sources, source_key, read_topic_file, select_window
+)
+from pages.bagExtract import gen_csv_task, output_path, is_video_config
+
+# Bag backed trips: a .DADS with a 'config' section can be opened before
+# extraction. Loading is lazy per topic: the first read of a topic extracts
+# all of it from the bag (npz, raw fast path) into csv/, like a BagToCsvApp
+# run would, tracked by the usual manifest. Reads with a time window are
+# cut from that file.
+
+
+class BagSource:
+    typestore = get_typestore(Stores.ROS1_NOETIC)
+
+    def __init__(self, pwd, cfg, fmt='npz'):
+        self.pwd = pwd
+        self.cfg = cfg
+        self.fmt = fmt
+
+    def extract(self, bag_name, config_key, target_dir):
+        os.makedirs(target_dir, exist_ok=True)
+        options = {'override': False, 'format': self.fmt, 'fast_path': True}
+        result = gen_csv_task((0, (bag_name, self.pwd, target_dir, self.cfg[config_key], config_key),
+                               options, self.typestore))
+        path = output_path(target_dir, bag_name, config_key, self.cfg[config_key], options)
+        if not os.path.exists(path):
+            raise FileNotFoundError(result)
+        return path
+
+    def __call__(self, bag_name, config_key, columns=None, start=None, stop=None):
+        if config_key not in self.cfg:
+            raise FileNotFoundError(f"{config_key} is not in the trip config")
+        if is_video_config(self.cfg[config_key]):
+            raise FileNotFoundError(f"{config_key} is a video key, its sync table comes with the video extraction")
+        if not os.path.exists(os.path.join(self.pwd, bag_name)):
+            raise FileNotFoundError(os.path.join(self.pwd, bag_name))
+        path = self.extract(bag_name, config_key, os.path.join(self.pwd, 'csv'))
+        if start is None and stop is None:
+            return read_topic_file(path, columns)
+        frame = read_topic_file(path, None if columns is None else ['time'] + [c for c in columns if c != 'time'])
+        frame = select_window(frame, start, stop)
+        return frame if columns is None else frame[list(columns)]
+
+
+def register_bag_source(pwd, cfg, fmt='npz'):
+    topic_sources[source_key(pwd)] = BagSource(pwd, cfg, fmt)
+
+def unregister_bag_source(pwd):
+    topic_sources.pop(source_key(pwd), None)
+
+def trip_config(main_dict, cfg):
+    # config entries of the trip topics, stored in the .DADS so it can be
+    # opened without extraction
+    return {key: cfg[key] for key in main_dict.get('topics', {}) if key in cfg}
@@ -11,8 +11,12 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt
 try:
     from pages.lidar_process import Ui_Form
+    from pages.topicIO import read_topics, open_compressed, CODECS, CODEC_EXT
+    from pages.timeIndex import TimeIndex
 except:
     from lidar_process import Ui_Form
+    from topicIO import read_topics, open_compressed, CODECS, CODEC_EXT
+    from timeIndex import TimeIndex
 
 def get_label(label: str):
     if 'car' in label:
@@ -24,14 +28,11 @@ def get_label(label: str):
     else:
         return ''
     
-def get_closest(key, dict):
-        if dict=={}:
-            return 0, 0
-        try:
-            return key, dict[key]
-        except:
-            key_n = min(dict.keys(), key=lambda x: abs(int(x) - int(key)))
-            return key_n, dict[key_n]
+def values_at(index, times):
+    # nearest sample per time, 0 without samples
+    if not len(index):
+        return np.zeros(len(times))
+    return index.nearest(times)[1]
 
 class trackObj:
     def __init__(self, Q_var=1, R_var=1):
@@ -124,6 +125,7 @@ class lidarProcessApp(QtWidgets.QWidget, Ui_Form):
         self.browseB.clicked.connect(self.open_dads)
         self.csvList.itemClicked.connect(self.handle_item_click)
         self.applyB.clicked.connect(self.cleanUp)
+        self.codec.addItems(CODECS)
 
         self.progressBar.setValue(0)
         self.progressBar.setEnabled(False)
@@ -177,22 +179,12 @@ class lidarProcessApp(QtWidgets.QWidget, Ui_Form):
         if not checked:
             return
         dir_name = os.path.dirname(self.dads_pwd.item(0).text())
-        self.speed = {}
-        for file in checked:
-            file_path = os.path.join(dir_name, 'csv', file + '.ssc_velocity')
-            data = pd.read_csv(file_path)
-            data = data.dropna()
-            data = data.reset_index(drop=True)
-            for i in range(len(data)):
-                self.speed[int(data.loc[i, 'time'])] = float(data.loc[i, 'velocity'])
-        self.heading = {}
-        for file in checked:
-            file_path = os.path.join(dir_name, 'csv', file + '.steering_feedback')
-            data = pd.read_csv(file_path)
-            data = data.dropna()
-            data = data.reset_index(drop=True)
-            for i in range(len(data)):
-                self.speed[int(data.loc[i, 'time'])] = -float(data.loc[i, 'steering'])
+        data = pd.concat(read_topics(dir_name, checked, 'ssc_velocity', ['time', 'velocity']))
+        data = data.dropna()
+        self.speed = TimeIndex(data['time'], data['velocity'].to_numpy(dtype=float))
+        data = pd.concat(read_topics(dir_name, checked, 'steering_feedback', ['time', 'steering']))
+        data = data.dropna()
+        self.heading = TimeIndex(data['time'], -data['steering'].to_numpy(dtype=float))
 
     
     def cleanUp(self):
@@ -201,22 +193,13 @@ class lidarProcessApp(QtWidgets.QWidget, Ui_Form):
         if not checked:
             return
         dir_name = os.path.dirname(self.dads_pwd.item(0).text())
-        file_name = os.path.join(checked[0]+'.lidar')
+        file_name = os.path.join(checked[0]+'.lidar'+CODEC_EXT.get(self.codec.currentText(), ''))
         self.progressBar.setMaximum(len(checked))
         self.progressBar.setEnabled(True)
         self.progressBar.setValue(0)
-        data_list = []
-        idx = 0
-        max = 0
-        for file in checked:
-            idx += 1
-            self.progressBar.setValue(idx)
-            file_path = os.path.join(dir_name, 'csv', file + '.lidarObj')
-            data = pd.read_csv(file_path)
-            data = data.dropna()
-            data = data.reset_index(drop=True)
-            data_list.append(data)
-            max += len(data)
+        data_list = [data.dropna().reset_index(drop=True)
+                     for data in read_topics(dir_name, checked, 'lidarObj', progress=self.progressBar.setValue)]
+        max = sum(len(data) for data in data_list)
         self.report.setText('Task 2/3: Merging CSV files...')
         self.progressBar.setMaximum(max)
         self.progressBar.setValue(0)
@@ -242,7 +225,7 @@ class lidarProcessApp(QtWidgets.QWidget, Ui_Form):
                 else:
                     self.lidar[key].append(entry)
         self.report.setText('Task 3/3: Saving as json...')
-        with open(os.path.join(dir_name, file_name), 'w') as f:
+        with open_compressed(os.path.join(dir_name, file_name), 'w') as f:
             json.dump(self.lidar, f)
         self.main_dict['lidar'] = file_name
         self.extern_func()
@@ -255,20 +238,13 @@ class lidarProcessApp(QtWidgets.QWidget, Ui_Form):
         if not checked:
             return
         dir_name = os.path.dirname(self.dads_pwd.item(0).text())
-        file_name = os.path.join(checked[0]+'.lidar')
+        file_name = os.path.join(checked[0]+'.lidar'+CODEC_EXT.get(self.codec.currentText(), ''))
         self.progressBar.setMaximum(len(checked))
         self.progressBar.setEnabled(True)
         self.progressBar.setValue(0)
-        idx = 0
-        lidar_data = pd.DataFrame()
-        for file in checked:
-            idx += 1
-            self.progressBar.setValue(idx)
-            file_path = os.path.join(dir_name, 'csv', file + '.lidarObj')
-            data = pd.read_csv(file_path)
-            data = data.dropna()
-            lidar_data = pd.concat([lidar_data, data], axis=0)
-        
+        lidar_data = pd.concat([data.dropna() for data in
+                                read_topics(dir_name, checked, 'lidarObj', progress=self.progressBar.setValue)], axis=0)
+
         lidar_data = lidar_data.reset_index(drop=True)
         time = np.unique(lidar_data['time'])
         self.report.setText('Task 2/3: Tracking with KF...')
@@ -278,9 +254,9 @@ class lidarProcessApp(QtWidgets.QWidget, Ui_Form):
         archived = []
         id_ = 0
         progress_idx = 0
-        for t in time:
-            _, speed_ = get_closest(t, self.speed)
-            _, heading_ = get_closest(t, self.heading)
+        speeds = values_at(self.speed, time)
+        headings = values_at(self.heading, time)
+        for t, speed_, heading_ in zip(time, speeds, headings):
 
             progress_idx += 1
             self.progressBar.setValue(progress_idx)
@@ -343,7 +319,7 @@ class lidarProcessApp(QtWidgets.QWidget, Ui_Form):
             else:
                 self.lidar[key].append(entry)
         
-        with open(os.path.join(dir_name, file_name), 'w') as f:
+        with open_compressed(os.path.join(dir_name, file_name), 'w') as f:
             json.dump(self.lidar, f)
         self.main_dict['lidar'] = file_name
         self.extern_func()
@@ -47,6 +47,12 @@ class Ui_Form(object):
         self.progressBar.setProperty("value", 24)
         self.progressBar.setObjectName("progressBar")
         self.horizontalLayout_2.addWidget(self.progressBar)
+        self.label_codec = QtWidgets.QLabel(Form)
+        self.label_codec.setObjectName("label_codec")
+        self.horizontalLayout_2.addWidget(self.label_codec)
+        self.codec = QtWidgets.QComboBox(Form)
+        self.codec.setObjectName("codec")
+        self.horizontalLayout_2.addWidget(self.codec)
         self.applyB = QtWidgets.QPushButton(Form)
         self.applyB.setObjectName("applyB")
         self.horizontalLayout_2.addWidget(self.applyB)
@@ -61,6 +67,7 @@ class Ui_Form(object):
         self.label.setText(_translate("Form", "Select *.DADS"))
         self.browseB.setText(_translate("Form", "Browse"))
         self.label_2.setText(_translate("Form", "Select csv(s)"))
+        self.label_codec.setText(_translate("Form", "Compression:"))
         self.applyB.setText(_translate("Form", "Clean Up"))
 
 
@@ -16,17 +16,19 @@ from PyQt5.QtGui import QPixmap, QImage
 
 
 from pages.plot import Ui_plot
+from pages.tripStore import TripStore
 
 file_path = os.path.abspath(__file__)
 dir_path = os.path.dirname(file_path)
 
 class PlotApp(QtWidgets.QWidget, Ui_plot):
-    def __init__(self, main_dict: dict, extern=None):
+    def __init__(self, main_dict: dict, extern=None, store=None):
         super(PlotApp, self).__init__()
         self.setAttribute(QtCore.Qt.WA_QuitOnClose)
         self.setupUi(self)
         self.main_dict = main_dict
         self.extern = extern
+        self.store = store if store is not None else TripStore(main_dict)
         self.adjustUI()
 
     def adjustUI(self):
@@ -37,8 +39,7 @@ class PlotApp(QtWidgets.QWidget, Ui_plot):
             to_be_checked.append((plt[1], plt[2]))
         for topic in self.main_dict['topics'].keys():
             self.colList.addItem('--' + topic)
-            data = pd.read_csv(os.path.join(self.main_dict['pwd'], 'csv', self.main_dict['topics'][topic][0]+'.'+topic))
-            for col in data.columns:
+            for col in self.store.column_names(topic):
                 if col == 'time':
                     continue
                 self.add_item(col)
@@ -0,0 +1,144 @@
+import numpy as np
+from rosbags.interfaces import Nodetype
+
+# ROS1 wire format: little endian, packed, no alignment padding
+ROS1_PRIMITIVES = {
+    'bool': '?', 'byte': 'u1', 'char': 'u1',
+    'int8': 'i1', 'uint8': 'u1',
+    'int16': '<i2', 'uint16': '<u2',
+    'int32': '<i4', 'uint32': '<u4',
+    'int64': '<i8', 'uint64': '<u8',
+    'float32': '<f4', 'float64': '<f8',
+}
+UINT32 = np.dtype('<u4')
+
+def fixed_size(typestore, desc):
+    node, detail = desc
+    if node == Nodetype.BASE:
+        if detail[0] not in ROS1_PRIMITIVES:
+            return None
+        return np.dtype(ROS1_PRIMITIVES[detail[0]]).itemsize
+    if node == Nodetype.NAME:
+        total = 0
+        for _, sub in typestore.get_msgdef(detail).fields:
+            size = fixed_size(typestore, sub)
+            if size is None:
+                return None
+            total += size
+        return total
+    if node == Nodetype.ARRAY:
+        size = fixed_size(typestore, detail[0])
+        return None if size is None else size * detail[1]
+    return None
+
+def walk_layout(typestore, typename, prefix=()):
+    # Flattened wire layout: ('field', path, dtype) for primitives,
+    # ('skip', path, nbytes) for fixed blocks that are never targets,
+    # ('var', path, elemsize) for length prefixed strings/sequences and
+    # ('unsupported', path, None) for anything whose size needs a full parse.
+    for name, desc in typestore.get_msgdef(typename).fields:
+        node, detail = desc
+        path = prefix + (name,)
+        if node == Nodetype.NAME:
+            yield from walk_layout(typestore, detail, path)
+        elif node == Nodetype.BASE and detail[0] == 'string':
+            yield 'var', path, 1
+        elif node == Nodetype.BASE:
+            yield 'field', path, np.dtype(ROS1_PRIMITIVES[detail[0]])
+        elif node == Nodetype.ARRAY:
+            size = fixed_size(typestore, desc)
+            yield ('skip', path, size) if size is not None else ('unsupported', path, None)
+        else:
+            size = fixed_size(typestore, detail[0])
+            yield ('var', path, size) if size is not None else ('unsupported', path, None)
+
+
+class RawPlan:
+    # Segments are runs of fixed layout separated by one variable length
+    # field each; target offsets are relative to the start of their segment.
+    def __init__(self, segments, n_fields):
+        self.segments = segments
+        self.n_fields = n_fields
+
+    def decode(self, raws):
+        lengths = np.fromiter((len(raw) for raw in raws), dtype=np.int64, count=len(raws))
+        buf = np.frombuffer(b''.join(raws), dtype=np.uint8)
+        pos = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        columns = [None] * self.n_fields
+        for size, fields, elemsize in self.segments:
+            for idx, offset, dtype in fields:
+                columns[idx] = gather(buf, pos + offset, dtype)
+            if elemsize is not None:
+                pos = pos + size
+                count = gather(buf, pos, UINT32).astype(np.int64)
+                pos = pos + 4 + count * elemsize
+        return columns
+
+def gather(buf, offsets, dtype):
+    idx = offsets[:, None] + np.arange(dtype.itemsize)
+    return buf[idx].view(dtype)[:, 0]
+
+def compile_raw_plan(typestore, msgtype, fields):
+    # Returns None when a target is not a primitive or sits behind a field
+    # whose size cannot be read from a length prefix; callers then fall back
+    # to full deserialization.
+    wanted = {tuple(fld.split('.')[1:]): idx for idx, fld in enumerate(fields)}
+    if not wanted or len(wanted) != len(fields):
+        return None
+    segments = [[0, [], None]]
+    found = 0
+    try:
+        for kind, path, arg in walk_layout(typestore, msgtype):
+            if found == len(wanted):
+                break
+            seg = segments[-1]
+            if kind == 'field':
+                if path in wanted:
+                    seg[1].append((wanted[path], seg[0], arg))
+                    found += 1
+                seg[0] += arg.itemsize
+            elif kind == 'skip':
+                seg[0] += arg
+            elif kind == 'var':
+                seg[2] = arg
+                segments.append([0, [], None])
+            else:
+                return None
+    except KeyError:
+        return None
+    if found < len(wanted):
+        return None
+    while not segments[-1][1]:
+        segments.pop()
+    segments[-1][2] = None
+    return RawPlan([tuple(seg) for seg in segments], len(fields))
+
+
+class RawBatcher:
+    batch_size = 4096
+
+    def __init__(self, plan, writer, fallback):
+        self.plan = plan
+        self.writer = writer
+        self.fallback = fallback
+        self.times = []
+        self.raws = []
+
+    def add(self, t, raw):
+        self.times.append(t)
+        self.raws.append(raw)
+        if len(self.raws) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.raws:
+            return
+        try:
+            columns = self.plan.decode(self.raws)
+        except (IndexError, ValueError):
+            for t, raw in zip(self.times, self.raws):
+                self.writer.write_rows(self.fallback(raw, t))
+        else:
+            self.writer.write_columns([np.asarray(self.times, dtype=np.int64)] + columns)
+        self.times = []
+        self.raws = []
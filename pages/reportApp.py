@@ -10,17 +10,14 @@ import os
 
 from PyQt5.QtWidgets import QApplication, QFileDialog
 
+from pages.tripStore import TripStore
+from pages.timeIndex import TimeIndex
+from pages.tripSummary import trip_summary
+
 
 file_path = os.path.abspath(__file__)
 dir_path = os.path.dirname(file_path)
 
-def get_closest(key, dict):
-        try:
-            return key, dict[key]
-        except:
-            key_n = min(dict.keys(), key=lambda x: abs(int(x) - int(key)))
-            return key_n, dict[key_n]
-
 folium_icon_colors = [
     'red',
     'blue',         # default
@@ -44,10 +41,12 @@ folium_icon_colors = [
 ]
 
 class report_Generator:
-    def __init__(self, main_dict, gps_dict) -> None:
+    def __init__(self, main_dict, gps_dict, store=None) -> None:
         pass
         self.main_dict = main_dict
         self.gps = gps_dict
+        self.gps_index = TimeIndex(list(gps_dict.keys()), np.array(list(gps_dict.values()), dtype=float).reshape(-1, 2))
+        self.store = store if store is not None else TripStore(main_dict)
 
     def create_map(self):
         route = [[lat, lon] for lat, lon in self.gps.values()]
@@ -70,7 +69,7 @@ class report_Generator:
                              'mrk_grp': folium.FeatureGroup(name=sc, show=True)}
         
         for key in self.main_dict['scenarios'].keys():
-            loc = get_closest(int(key), self.gps)[1]
+            loc = self.gps_index.nearest(int(key))[1].tolist()
             self.scen_dict[self.main_dict['scenarios'][key][1]]['locs'].append(loc)
         
         for key in self.scen_dict.keys():
@@ -91,15 +90,8 @@ class report_Generator:
         for plt in self.main_dict['plots']:
             time = []
             y = []
-            for file in self.main_dict['topics'][plt[1]]:
-                file_path = os.path.join(self.main_dict['pwd'], 'csv', file + '.' + plt[1])
-                data = pd.read_csv(file_path)
-                if plt[2] in data.columns and 'time' in data.columns:
-                    for i in range(len(data)):
-                        time.append(data['time'][i])
-                        y.append(data[plt[2]][i])
-                else:
-                    continue
+            if self.store.has(plt[1], plt[2]) and self.store.has(plt[1], 'time'):
+                time, y = self.store.columns(plt[1], ['time', plt[2]])
             fig = go.Figure()
             fig.add_trace(go.Scatter(x=time, y=y, mode='lines+markers', name='y = x²'))
             fig.update_layout(xaxis_title='time (s)',
@@ -130,77 +122,19 @@ class report_Generator:
         self.pie_data = f"data:image/png;base64,{encoded}"
 
     def create_vehicle_dynamics(self):
-        self.vehicle_dynamics = {}
-        if "ssc_velocity" in self.main_dict['topics'].keys():
-            time = []
-            speed = []
-            for file in self.main_dict['topics']['ssc_velocity']:
-                file_path = os.path.join(self.main_dict['pwd'], 'csv', file + '.' + 'ssc_velocity')
-                data = pd.read_csv(file_path)
-                if 'velocity' in data.columns and 'time' in data.columns:
-                    for i in range(len(data)):
-                        time.append(data['time'][i])
-                        speed.append(data['velocity'][i])
-                else:
-                    continue
-            speed = np.array(speed)
-            time = np.array(time)
-            threshold = 0.3
-            stopped = speed < threshold
-            stop_segments = np.diff(stopped.astype(int)) == 1
-            num_full_stops = np.sum(stop_segments)
-
-            # self.vehicle_dynamics['Average Speed m/s'] = f"{np.mean(speed[speed>0]):.f}"
-            # self.vehicle_dynamics['Average Speed kph'] = f"{np.mean(speed[speed>0])*3.6:.f}"
-            self.vehicle_dynamics['Average Speed (mph)'] = f"{np.mean(speed[speed>0])*2.23694:.01f}"
-            self.vehicle_dynamics['Maximum Speed (mph)'] = f"{np.max(speed)*2.23694:.01f}"
-            self.vehicle_dynamics['Number of full stops'] = f"{num_full_stops}"
-        else:
-            self.vehicle_dynamics['Average Speed (mph)'] = f"not available"
-            self.vehicle_dynamics['Maximum Speed (mph)'] = f"not available"
-            self.vehicle_dynamics['Number of full stops'] = f"not available"
+        summary = trip_summary(self.store)
 
-        if "ssc_velocity" in self.main_dict['topics'].keys():
-            time = []
-            accel = []
-            for file in self.main_dict['topics']['ssc_velocity']:
-                file_path = os.path.join(self.main_dict['pwd'], 'csv', file + '.' + 'ssc_velocity')
-                data = pd.read_csv(file_path)
-                if 'acceleration' in data.columns and 'time' in data.columns:
-                    for i in range(len(data)):
-                        time.append(data['time'][i])
-                        accel.append(data['acceleration'][i])
-                else:
-                    continue
-
-            accel = np.array(accel)
-            time = np.array(time)
-            self.vehicle_dynamics['Maximum Acceleration (m/s/s)'] = f"{np.max(accel):.01f}"
-            self.vehicle_dynamics['Maximum Decceleration (m/s/s)'] = f"{np.min(accel):.01f}"
-        else:
-            self.vehicle_dynamics['Maximum Acceleration (m/s/s)'] = f"not available"
-            self.vehicle_dynamics['Maximum Decceleration (m/s/s)'] = f"not available"
+        def show(value, scale=1, fmt='.01f'):
+            return "not available" if value is None else f"{value*scale:{fmt}}"
+
+        self.vehicle_dynamics = {}
+        self.vehicle_dynamics['Average Speed (mph)'] = show(summary['average_speed'], 2.23694)
+        self.vehicle_dynamics['Maximum Speed (mph)'] = show(summary['max_speed'], 2.23694)
+        self.vehicle_dynamics['Number of full stops'] = show(summary['full_stops'], fmt='d')
+        self.vehicle_dynamics['Maximum Acceleration (m/s/s)'] = show(summary['max_acceleration'])
+        self.vehicle_dynamics['Maximum Decceleration (m/s/s)'] = show(summary['max_deceleration'])
+        self.vehicle_dynamics['Maximum Steering Rate (rad/s)'] = show(summary['max_steering_rate'])
 
-        if "vehi_steering_report" in self.main_dict['topics'].keys():
-            time = []
-            vs = []
-            for file in self.main_dict['topics']['vehi_steering_report']:
-                file_path = os.path.join(self.main_dict['pwd'], 'csv', file + '.' + 'vehi_steering_report')
-                data = pd.read_csv(file_path)
-                if 'steering_wheel_angle' in data.columns and 'time' in data.columns:
-                    for i in range(len(data)):
-                        time.append(data['time'][i])
-                        vs.append(data['steering_wheel_angle'][i])
-                else:
-                    continue
-            vs = np.array(vs)
-            time = np.array(time)/1E9
-
-            steering_rate = np.diff(vs) / np.diff(time)
-            self.vehicle_dynamics['Maximum Steering Rate (rad/s)'] = f"{np.max(np.abs(steering_rate)):.01f}"
-        else:
-            self.vehicle_dynamics['Maximum Steering Rate (rad/s)'] = f"not available"
-       
     def generate_report(self):
         self.create_html()
         self.create_map()
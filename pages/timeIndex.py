@@ -0,0 +1,85 @@
+import numpy as np
+
+# Sorted int64 times (ns) and the values recorded at them, for the nearest
+# sample lookups done on every video frame, map update and scenario jump.
+# Every lookup is a binary search and also takes an array of times, in which
+# case arrays of indices / times / values come back.
+
+class TimeIndex:
+    def __init__(self, times=(), values=None):
+        times = np.asarray(times).astype(np.int64).reshape(-1)
+        order = np.argsort(times, kind='stable')
+        self.times = times[order]
+        if values is None:
+            values = np.arange(len(times))
+        elif not isinstance(values, np.ndarray):
+            # lists of lists (lidar objects) stay python objects
+            items = values
+            values = np.empty(len(items), dtype=object)
+            for i, x in enumerate(items):
+                values[i] = x
+        self.values = values[order]
+
+    @classmethod
+    def from_dict(cls, data):
+        # keys may be times as strings, e.g. from json
+        return cls(list(data.keys()), list(data.values()))
+
+    def __len__(self):
+        return len(self.times)
+
+    def nearest_index(self, t):
+        if not len(self.times):
+            raise IndexError("empty TimeIndex")
+        t = np.asarray(t).astype(np.int64)
+        if len(self.times) == 1:
+            return np.zeros_like(t, dtype=np.intp)[()]
+        i = np.clip(np.searchsorted(self.times, t), 1, len(self.times) - 1)
+        # ties go to the earlier sample
+        return (i - (t - self.times[i - 1] <= self.times[i] - t))[()]
+
+    def nearest(self, t):
+        i = self.nearest_index(t)
+        return self.times[i], self.values[i]
+
+    def before(self, t):
+        # last sample at or before t, -1 when there is none
+        return (np.searchsorted(self.times, np.asarray(t).astype(np.int64), side='right') - 1)[()]
+
+    def after(self, t):
+        # first sample at or after t, len(self) when there is none
+        return np.searchsorted(self.times, np.asarray(t).astype(np.int64), side='left')[()]
+
+    def range(self, start=None, stop=None):
+        # samples in [start, stop)
+        lo = 0 if start is None else self.after(start)
+        hi = len(self.times) if stop is None else self.after(stop)
+        return self.times[lo:hi], self.values[lo:hi]
+
+
+class CameraSync:
+    # one camera's sync table: video frame numbers (seq) <-> ROS times
+    def __init__(self, seq, time):
+        seq = np.asarray(seq).astype(np.int64)
+        time = np.asarray(time).astype(np.int64)
+        order = np.argsort(seq, kind='stable')
+        self.seq = seq[order]
+        self.seq_times = time[order]
+        self.by_time = TimeIndex(time, seq)
+
+    def frame_time(self, frame):
+        # time of exactly that frame, None (-1 for arrays) when not recorded
+        frame = np.asarray(frame).astype(np.int64)
+        i = np.minimum(np.searchsorted(self.seq, frame), max(len(self.seq) - 1, 0))
+        if not len(self.seq):
+            found = np.zeros_like(frame, dtype=bool)
+        else:
+            found = self.seq[i] == frame
+        if frame.ndim == 0:
+            return int(self.seq_times[i]) if found else None
+        return np.where(found, self.seq_times[i] if len(self.seq) else -1, -1)
+
+    def time_frame(self, t):
+        # nearest frame to a time
+        frame = self.by_time.nearest(t)[1]
+        return frame if np.ndim(frame) else int(frame)
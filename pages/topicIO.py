@@ -0,0 +1,340 @@
+import io
+import os
+import json
+import hashlib
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import zstandard
+import lz4.frame
+
+TOPIC_FORMATS = ['csv', 'npz']
+CODECS = ['none', 'zstd', 'lz4']
+CODEC_EXT = {'zstd': '.zst', 'lz4': '.lz4'}
+# parsing and decompression release the GIL, so bags load side by side
+READ_THREADS = min(16, 2 * (os.cpu_count() or 1))
+
+def codec_of(path):
+    for codec, ext in CODEC_EXT.items():
+        if path.endswith(ext):
+            return codec
+    return 'none'
+
+def strip_codec(path):
+    codec = codec_of(path)
+    return path[:-len(CODEC_EXT[codec])] if codec != 'none' else path
+
+def open_compressed(path, mode='r', codec=None):
+    # like open(); the codec defaults to the one of the file extension
+    codec = codec or codec_of(path)
+    if codec == 'none':
+        return open(path, mode)
+    mode = mode.replace('t', '') + ('' if 'b' in mode else 't')
+    if codec == 'zstd':
+        return zstandard.open(path, mode)
+    return lz4.frame.open(path, mode)
+
+def topic_path(target_dir, bag_name, config_key, fmt='csv', codec='none'):
+    path = os.path.join(target_dir, f"{bag_name}.{config_key}")
+    if fmt != 'csv':
+        path = f"{path}.{fmt}"
+    return path + CODEC_EXT.get(codec, '')
+
+def find_topic_file(target_dir, bag_name, config_key):
+    for fmt in reversed(TOPIC_FORMATS):
+        for codec in CODECS:
+            path = topic_path(target_dir, bag_name, config_key, fmt, codec)
+            if os.path.exists(path):
+                return path
+    return None
+
+def remove_topic_variants(path):
+    # outputs of the same topic in other formats / codecs and their
+    # manifests, so find_topic_file never picks up a stale one
+    target_dir = os.path.dirname(path)
+    bag_name, config_key = split_topic_file(os.path.basename(path))
+    for fmt in TOPIC_FORMATS:
+        for codec in CODECS:
+            other = topic_path(target_dir, bag_name, config_key, fmt, codec)
+            if other != path:
+                if os.path.exists(other):
+                    os.remove(other)
+                remove_manifest(other)
+
+def part_path(path, part_id):
+    return f"{path}.part{part_id}"
+
+def tmp_path(path):
+    return f"{path}.tmp"
+
+def split_topic_file(file_name):
+    # '<bag>.<topic>[.<fmt>][.<codec>]' -> (bag, topic), bag names keep their own dots
+    file_name = strip_codec(file_name)
+    root, ext = os.path.splitext(file_name)
+    if ext[1:] in TOPIC_FORMATS:
+        file_name = root
+    bag_name, _, config_key = file_name.rpartition('.')
+    return bag_name, config_key
+
+
+class CsvTopicWriter:
+    batch_rows = 4096
+
+    # rows go to a temp file that replaces the output only on close
+    def __init__(self, path, cols):
+        self.path = path
+        self.f = open_compressed(tmp_path(path), 'w', codec_of(path))
+        self.f.write('time,' + ','.join(cols) + '\n')
+        self.lines = []
+
+    def write_rows(self, rows):
+        self.lines.extend(','.join(map(str, row)) for row in rows)
+        if len(self.lines) >= self.batch_rows:
+            self.flush()
+
+    def write_columns(self, columns):
+        self.write_rows(zip(*[col.tolist() for col in columns]))
+
+    def flush(self):
+        if self.lines:
+            self.f.write('\n'.join(self.lines) + '\n')
+            self.lines = []
+
+    def close(self):
+        self.flush()
+        self.f.close()
+        os.replace(tmp_path(self.path), self.path)
+
+    def discard(self):
+        self.f.close()
+        os.remove(tmp_path(self.path))
+
+
+class NpzTopicWriter:
+    # Columns are kept as lists until close, then stored typed: int64 time
+    # and integer fields, float64 numbers and bools, categorical (codes +
+    # categories) for everything else. Fields holding lists or arrays are
+    # stored as their text, one value per row, the same as in csv.
+    def __init__(self, path, cols):
+        self.path = path
+        self.cols = ['time'] + list(cols)
+        self.data = [[] for _ in self.cols]
+
+    def write_rows(self, rows):
+        for row in rows:
+            for col, value in zip(self.data, row):
+                col.append(value)
+
+    def write_columns(self, columns):
+        for col, values in zip(self.data, columns):
+            col.extend(values.tolist())
+
+    def close(self):
+        arrays = {'time': np.asarray(self.data[0], dtype=np.int64)}
+        for col, values in zip(self.cols[1:], self.data[1:]):
+            try:
+                arr = np.asarray(values)
+            except ValueError:
+                # ragged lists
+                arr = None
+            if arr is not None and arr.ndim == 1 and arr.dtype.kind in 'iu':
+                arrays[col] = arr.astype(np.int64)
+            elif arr is not None and arr.ndim == 1 and arr.dtype.kind in 'fb':
+                arrays[col] = arr.astype(np.float64)
+            else:
+                text = np.asarray(['' if v is None else str(v) for v in values], dtype=str)
+                arrays[col], arrays[col + '.categories'] = encode_text(text)
+        arrays['.columns'] = np.asarray(self.cols)
+        save_npz(self.path, arrays)
+
+    def discard(self):
+        self.data = None
+
+
+def save_npz(path, arrays):
+    buf = io.BytesIO()
+    np.savez(buf, **arrays)
+    with open_compressed(tmp_path(path), 'wb', codec_of(path)) as f:
+        f.write(buf.getbuffer())
+    os.replace(tmp_path(path), path)
+
+def load_npz(path):
+    if codec_of(path) == 'none':
+        return np.load(path)
+    with open_compressed(path, 'rb') as f:
+        return np.load(io.BytesIO(f.read()))
+
+def is_npz(path):
+    return strip_codec(path).endswith('.npz')
+
+def encode_text(text):
+    categories, codes = np.unique(text, return_inverse=True)
+    codes = codes.astype(np.int32)
+    codes[text == ''] = -1
+    return codes, categories
+
+def decode_text(codes, categories):
+    return np.append(categories, '')[codes]
+
+
+def open_topic_writer(path, cols, fmt='csv'):
+    if fmt == 'npz':
+        return NpzTopicWriter(path, cols)
+    return CsvTopicWriter(path, cols)
+
+def merge_topic_files(paths, out_path):
+    # Parts cover consecutive time windows, so concatenating them in order
+    # keeps the merged output sorted by time.
+    if not is_npz(out_path):
+        with open_compressed(tmp_path(out_path), 'w', codec_of(out_path)) as out:
+            for idx, path in enumerate(paths):
+                with open_compressed(path) as f:
+                    header = f.readline()
+                    if idx == 0:
+                        out.write(header)
+                    shutil.copyfileobj(f, out)
+        os.replace(tmp_path(out_path), out_path)
+        return
+    parts = []
+    for path in paths:
+        with load_npz(path) as data:
+            parts.append({key: data[key] for key in data.files})
+    # empty windows carry no type information, leave them out
+    parts = [p for p in parts if len(p['time'])] or parts[:1]
+    arrays = {'.columns': parts[0]['.columns']}
+    for col in [str(c) for c in parts[0]['.columns']]:
+        if any(col + '.categories' in p for p in parts):
+            text = np.concatenate([
+                decode_text(p[col], p[col + '.categories']) if col + '.categories' in p
+                else np.where(np.isnan(p[col]), '', p[col].astype(str))
+                for p in parts])
+            arrays[col], arrays[col + '.categories'] = encode_text(text)
+        else:
+            arrays[col] = np.concatenate([p[col] for p in parts])
+    save_npz(out_path, arrays)
+
+# Every extracted output has a manifest in <csv>/.manifest/ naming the bag
+# (size, mtime) and config entry it was built from. An output is reused only
+# when its manifest is complete and still matches both.
+def manifest_path(path):
+    return os.path.join(os.path.dirname(path), '.manifest', os.path.basename(path) + '.json')
+
+def config_hash(config, fmt, window=None):
+    # window: (start, stop) of a time-windowed extraction
+    text = json.dumps([config, fmt] + ([list(window)] if window else []), sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+def bag_stamp(bag_path):
+    st = os.stat(bag_path)
+    return {'size': st.st_size, 'mtime': st.st_mtime_ns}
+
+def write_manifest(path, bag_path, chash, msg_count, complete=True, rows=None):
+    # rows: rows written, 0 records an output dropped for being empty
+    manifest = {'bag': os.path.basename(bag_path), **bag_stamp(bag_path),
+                'config': chash, 'messages': msg_count, 'complete': complete}
+    if rows is not None:
+        manifest['rows'] = rows
+    m_path = manifest_path(path)
+    os.makedirs(os.path.dirname(m_path), exist_ok=True)
+    with open(tmp_path(m_path), 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path(m_path), m_path)
+
+def read_manifest(path):
+    try:
+        with open(manifest_path(path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def remove_manifest(path):
+    try:
+        os.remove(manifest_path(path))
+    except OSError:
+        pass
+
+def is_up_to_date(path, bag_path, chash):
+    manifest = read_manifest(path)
+    if manifest is None or not manifest['complete'] or manifest['config'] != chash:
+        return False
+    try:
+        stamp = bag_stamp(bag_path)
+    except OSError:
+        return False
+    if (manifest['size'], manifest['mtime']) != (stamp['size'], stamp['mtime']):
+        return False
+    # topics missing from the bag or sampled down to nothing have no file
+    return os.path.exists(path) or manifest['messages'] == 0 or manifest.get('rows') == 0
+
+def read_topic_file(path, columns=None):
+    # columns the file does not have are left out
+    if not is_npz(path):
+        usecols = None if columns is None else (lambda c: c in columns)
+        if codec_of(path) == 'none':
+            return pd.read_csv(path, usecols=usecols)
+        with open_compressed(path) as f:
+            return pd.read_csv(f, usecols=usecols)
+    with load_npz(path) as data:
+        cols = [str(c) for c in data['.columns']]
+        if columns is not None:
+            cols = [c for c in cols if c in columns]
+        frame = {}
+        for col in cols:
+            if col + '.categories' in data.files:
+                frame[col] = pd.Categorical.from_codes(data[col], data[col + '.categories'])
+            else:
+                frame[col] = data[col]
+    return pd.DataFrame(frame)
+
+def topic_columns(path):
+    # column names from the csv header or the npz column list only
+    if not is_npz(path):
+        with open_compressed(path) as f:
+            return f.readline().strip().split(',')
+    with load_npz(path) as data:
+        return [str(c) for c in data['.columns']]
+
+# trip folder -> callable(bag_name, config_key, columns, start, stop) used
+# for topics that were never extracted, see lazyTrip.register_bag_source
+topic_sources = {}
+
+def source_key(pwd):
+    return os.path.normpath(os.path.abspath(pwd))
+
+def select_window(frame, start=None, stop=None):
+    # start inclusive, stop exclusive, in bag time (ns), like reader.messages
+    if start is not None:
+        frame = frame[frame['time'] >= start]
+    if stop is not None:
+        frame = frame[frame['time'] < stop]
+    return frame.reset_index(drop=True)
+
+def read_topic(pwd, bag_name, config_key, columns=None, start=None, stop=None):
+    csv_dir = os.path.join(pwd, 'csv')
+    path = find_topic_file(csv_dir, bag_name, config_key)
+    if path is None:
+        source = topic_sources.get(source_key(pwd))
+        if source is None:
+            raise FileNotFoundError(topic_path(csv_dir, bag_name, config_key))
+        return source(bag_name, config_key, columns, start, stop)
+    if start is None and stop is None:
+        return read_topic_file(path, columns)
+    frame = read_topic_file(path, None if columns is None else ['time'] + [c for c in columns if c != 'time'])
+    frame = select_window(frame, start, stop)
+    return frame if columns is None else frame[list(columns)]
+
+def read_topics(pwd, bag_names, config_key, columns=None, start=None, stop=None, progress=None):
+    # read_topic of every bag on a thread pool, frames in bag order;
+    # progress(done) is called on the calling thread as bags finish
+    if len(bag_names) <= 1:
+        frames = [read_topic(pwd, bag_name, config_key, columns, start, stop) for bag_name in bag_names]
+        if progress is not None and frames:
+            progress(1)
+        return frames
+    with ThreadPoolExecutor(min(READ_THREADS, len(bag_names))) as pool:
+        futures = [pool.submit(read_topic, pwd, bag_name, config_key, columns, start, stop) for bag_name in bag_names]
+        if progress is not None:
+            for done, _ in enumerate(as_completed(futures), 1):
+                progress(done)
+        return [future.result() for future in futures]
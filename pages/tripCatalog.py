@@ -0,0 +1,193 @@
+import os
+import json
+import sqlite3
+
+import numpy as np
+
+from pages.tripDoc import load_dads
+from pages.tripStore import TripStore
+from pages.tripSummary import trip_summary, SUMMARY_FIELDS
+from pages.timeIndex import TimeIndex
+
+# SQLite index over a folder of .DADS trips, so questions like "which trips
+# have a Turn with TTC below 2 s" are one query instead of opening every
+# trip. scan_trips() walks the folder and (re)indexes trips whose .DADS
+# changed since the last scan: trip info, summary stats (tripSummary),
+# topics, scenarios and the lowest TTC overall and around each scenario.
+# Paths are stored relative to the folder holding the catalog.
+
+CATALOG_NAME = 'trips.sqlite'
+SCENARIO_TTC_WINDOW = 5e9
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS trips (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE,
+    size INTEGER,
+    mtime INTEGER,
+    name TEXT,
+    end_time REAL,
+    min_ttc REAL,
+    info TEXT,
+    {', '.join(f'{field} REAL' for field in SUMMARY_FIELDS)}
+);
+CREATE TABLE IF NOT EXISTS topics (trip_id INTEGER, topic TEXT, bags INTEGER);
+CREATE TABLE IF NOT EXISTS scenarios (trip_id INTEGER, time INTEGER, scenario TEXT, min_ttc REAL);
+CREATE INDEX IF NOT EXISTS topics_topic ON topics (topic, trip_id);
+CREATE INDEX IF NOT EXISTS scenarios_scenario ON scenarios (scenario, trip_id);
+CREATE INDEX IF NOT EXISTS scenarios_trip ON scenarios (trip_id);
+CREATE INDEX IF NOT EXISTS topics_trip ON topics (trip_id);
+"""
+
+def catalog_path(root):
+    return os.path.join(root, CATALOG_NAME)
+
+def connect(db_path):
+    db = sqlite3.connect(db_path)
+    db.row_factory = sqlite3.Row
+    db.executescript(SCHEMA)
+    return db
+
+def find_dads(root):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d != 'csv' and not d.startswith('.'))
+        for file_name in sorted(filenames):
+            if file_name.endswith('.DADS'):
+                yield os.path.join(dirpath, file_name)
+
+def ttc_stats(store, main_dict):
+    # lowest TTC of the trip and within SCENARIO_TTC_WINDOW of each scenario
+    if 'time_to_collision' not in main_dict.get('topics', {}) or not store.has('time_to_collision', 'ttc'):
+        return None, {}
+    time, ttc = store.columns('time_to_collision', ['time', 'ttc'])
+    if not len(ttc):
+        return None, {}
+    index = TimeIndex(time, np.asarray(ttc, dtype=float))
+    near = {}
+    for key in main_dict.get('scenarios', {}):
+        _, values = index.range(int(key) - SCENARIO_TTC_WINDOW, int(key) + SCENARIO_TTC_WINDOW + 1)
+        near[key] = float(np.min(values)) if len(values) else None
+    return float(np.min(ttc)), near
+
+def index_trip(db, root, path):
+    main_dict = load_dads(path)
+    main_dict['pwd'] = os.path.dirname(path)
+    main_dict.setdefault('scenarios', {})
+    store = TripStore(main_dict)
+    try:
+        summary = trip_summary(store)
+        min_ttc, scenario_ttc = ttc_stats(store, main_dict)
+    except (OSError, KeyError, ValueError):
+        # bag backed trips that were never extracted have nothing to read
+        summary, min_ttc, scenario_ttc = dict.fromkeys(SUMMARY_FIELDS), None, {}
+    st = os.stat(path)
+    rel_path = os.path.relpath(path, root)
+    end_time = None
+    if summary['start_time'] is not None:
+        end_time = summary['start_time'] + summary['duration']
+    remove_trip(db, rel_path)
+    fields = ['path', 'size', 'mtime', 'name', 'end_time', 'min_ttc', 'info'] + SUMMARY_FIELDS
+    values = [rel_path, st.st_size, st.st_mtime_ns, os.path.splitext(os.path.basename(path))[0], end_time,
+              min_ttc, json.dumps(main_dict.get('info', {}))] + [summary[field] for field in SUMMARY_FIELDS]
+    trip_id = db.execute(f"INSERT INTO trips ({', '.join(fields)}) VALUES ({', '.join('?' * len(fields))})",
+                         values).lastrowid
+    db.executemany("INSERT INTO topics VALUES (?, ?, ?)",
+                   [(trip_id, topic, len(bags)) for topic, bags in main_dict.get('topics', {}).items()])
+    db.executemany("INSERT INTO scenarios VALUES (?, ?, ?, ?)",
+                   [(trip_id, int(key), scenario[1], scenario_ttc.get(key))
+                    for key, scenario in main_dict['scenarios'].items()])
+
+def remove_trip(db, rel_path):
+    row = db.execute("SELECT id FROM trips WHERE path = ?", (rel_path,)).fetchone()
+    if row is not None:
+        for table in ('topics', 'scenarios'):
+            db.execute(f"DELETE FROM {table} WHERE trip_id = ?", (row['id'],))
+        db.execute("DELETE FROM trips WHERE id = ?", (row['id'],))
+
+def scan_trips(root, db_path=None, force=False, progress=None):
+    # returns counts of indexed, unchanged, removed and failed trips
+    counts = {'indexed': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+    db = connect(db_path or catalog_path(root))
+    try:
+        known = {row['path']: (row['size'], row['mtime']) for row in db.execute("SELECT path, size, mtime FROM trips")}
+        paths = list(find_dads(root))
+        for i, path in enumerate(paths):
+            if progress is not None:
+                progress(i, len(paths), path)
+            rel_path = os.path.relpath(path, root)
+            st = os.stat(path)
+            if known.pop(rel_path, None) == (st.st_size, st.st_mtime_ns) and not force:
+                counts['unchanged'] += 1
+                continue
+            try:
+                index_trip(db, root, path)
+                counts['indexed'] += 1
+            except (OSError, KeyError, ValueError, TypeError):
+                counts['failed'] += 1
+            db.commit()
+        for rel_path in known:
+            remove_trip(db, rel_path)
+            counts['removed'] += 1
+        db.commit()
+    finally:
+        db.close()
+    return counts
+
+def find_trips(db_path, scenario=None, max_ttc=None, topics=(), min_distance=None, since=None, until=None,
+               name=None):
+    # trips matching every given filter; with both scenario and max_ttc
+    # the TTC has to be near that scenario. since/until are unix seconds.
+    where, params = [], []
+    if scenario and max_ttc is not None:
+        where.append("EXISTS (SELECT 1 FROM scenarios s WHERE s.trip_id = trips.id AND s.scenario = ? AND s.min_ttc < ?)")
+        params += [scenario, max_ttc]
+    elif scenario:
+        where.append("EXISTS (SELECT 1 FROM scenarios s WHERE s.trip_id = trips.id AND s.scenario = ?)")
+        params.append(scenario)
+    elif max_ttc is not None:
+        where.append("min_ttc < ?")
+        params.append(max_ttc)
+    for topic in topics:
+        where.append("EXISTS (SELECT 1 FROM topics t WHERE t.trip_id = trips.id AND t.topic = ?)")
+        params.append(topic)
+    if min_distance is not None:
+        where.append("distance_km >= ?")
+        params.append(min_distance)
+    if since is not None:
+        where.append("end_time >= ?")
+        params.append(since)
+    if until is not None:
+        where.append("start_time <= ?")
+        params.append(until)
+    if name:
+        where.append("name LIKE ?")
+        params.append(f"%{name}%")
+    query = ("SELECT trips.*, (SELECT COUNT(*) FROM scenarios s WHERE s.trip_id = trips.id) AS scenario_count "
+             "FROM trips")
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    query += " ORDER BY start_time, path"
+    root = os.path.dirname(os.path.abspath(db_path))
+    db = connect(db_path)
+    try:
+        trips = [dict(row) for row in db.execute(query, params)]
+    finally:
+        db.close()
+    for trip in trips:
+        trip['path'] = os.path.join(root, trip['path'])
+        trip['info'] = json.loads(trip['info'])
+    return trips
+
+def scenario_names(db_path):
+    db = connect(db_path)
+    try:
+        return [row[0] for row in db.execute("SELECT DISTINCT scenario FROM scenarios ORDER BY scenario")]
+    finally:
+        db.close()
+
+def topic_names(db_path):
+    db = connect(db_path)
+    try:
+        return [row[0] for row in db.execute("SELECT DISTINCT topic FROM topics ORDER BY topic")]
+    finally:
+        db.close()
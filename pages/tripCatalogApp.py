@@ -0,0 +1,146 @@
+import os
+import datetime
+
+from PyQt5 import QtWidgets
+from PyQt5.QtWidgets import QFileDialog, QTableWidgetItem
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
+
+from pages.trip_catalog import Ui_Form
+from pages.tripCatalog import catalog_path, scan_trips, find_trips, scenario_names, topic_names
+
+ANY = 'any'
+COLUMNS = [('Trip', 'name'), ('Start', 'start_time'), ('Duration', 'duration'), ('Distance (km)', 'distance_km'),
+           ('Scenarios', 'scenario_count'), ('Min TTC (s)', 'min_ttc'), ('Folder', 'path')]
+
+
+class ScanJob(QThread):
+    progress = pyqtSignal(int, int, str)
+    done = pyqtSignal(dict)
+
+    def __init__(self, root):
+        super().__init__()
+        self.root = root
+
+    def run(self):
+        self.done.emit(scan_trips(self.root, progress=self.progress.emit))
+
+
+class TripCatalogApp(QtWidgets.QWidget, Ui_Form):
+    def __init__(self, open_trip=None, root=None):
+        super(TripCatalogApp, self).__init__()
+        self.setupUi(self)
+        self.open_trip = open_trip
+        self.job = None
+        self.trips = []
+        self.adjustUI()
+        if root:
+            self.set_root(root)
+
+    def adjustUI(self):
+        self.openDirB.clicked.connect(self.browse)
+        self.scanB.clicked.connect(self.scan)
+        self.openB.clicked.connect(self.open_selected)
+        self.closeB.clicked.connect(self.close)
+        self.tripTable.itemDoubleClicked.connect(self.open_selected)
+        self.scenario.currentIndexChanged.connect(self.refresh)
+        self.topic.currentIndexChanged.connect(self.refresh)
+        self.maxTtc.valueChanged.connect(self.refresh)
+        self.minDistance.valueChanged.connect(self.refresh)
+        self.nameFilter.textChanged.connect(self.refresh)
+        self.tripTable.setColumnCount(len(COLUMNS))
+        self.tripTable.setHorizontalHeaderLabels([title for title, _ in COLUMNS])
+        self.tripTable.horizontalHeader().setStretchLastSection(True)
+        self.scanB.setEnabled(False)
+        self.openB.setEnabled(False)
+
+    def root(self):
+        return self.rootDir.item(0).text() if self.rootDir.count() else None
+
+    def browse(self):
+        root = QFileDialog.getExistingDirectory(self, 'Select Trips Folder')
+        if root:
+            self.set_root(root)
+
+    def set_root(self, root):
+        self.rootDir.clear()
+        self.rootDir.addItem(root)
+        self.scanB.setEnabled(True)
+        if os.path.exists(catalog_path(root)):
+            self.load_filters()
+        else:
+            self.scan()
+
+    def scan(self):
+        if self.root() is None or self.job is not None:
+            return
+        self.scanB.setEnabled(False)
+        self.job = ScanJob(self.root())
+        self.job.progress.connect(lambda i, n, path: self.report.setText(f"Scanning {i+1}/{n}: {os.path.basename(path)}"))
+        self.job.done.connect(self.scan_done)
+        self.job.start()
+
+    def scan_done(self, counts):
+        self.job.wait()
+        self.job = None
+        self.scanB.setEnabled(True)
+        self.load_filters()
+        self.report.setText(f"{len(self.trips)} trips | " + ', '.join(f"{v} {k}" for k, v in counts.items() if v))
+
+    def load_filters(self):
+        db_path = catalog_path(self.root())
+        for combo, names in ((self.scenario, scenario_names(db_path)), (self.topic, topic_names(db_path))):
+            current = combo.currentText()
+            combo.blockSignals(True)
+            combo.clear()
+            combo.addItems([ANY] + names)
+            if current in names:
+                combo.setCurrentText(current)
+            combo.blockSignals(False)
+        self.refresh()
+
+    def refresh(self):
+        if self.root() is None or not os.path.exists(catalog_path(self.root())):
+            return
+        scenario = self.scenario.currentText()
+        topic = self.topic.currentText()
+        self.trips = find_trips(
+            catalog_path(self.root()),
+            scenario=scenario if scenario not in ('', ANY) else None,
+            max_ttc=self.maxTtc.value() or None,
+            topics=[topic] if topic not in ('', ANY) else [],
+            min_distance=self.minDistance.value() or None,
+            name=self.nameFilter.text().strip() or None)
+        self.fill_table()
+        self.report.setText(f"{len(self.trips)} trips")
+
+    def fill_table(self):
+        self.tripTable.setSortingEnabled(False)
+        self.tripTable.setRowCount(len(self.trips))
+        for row, trip in enumerate(self.trips):
+            for col, (_, key) in enumerate(COLUMNS):
+                value = trip[key]
+                if value is None:
+                    text = ''
+                elif key == 'start_time':
+                    text = datetime.datetime.fromtimestamp(value).strftime('%Y-%m-%d %H:%M:%S')
+                elif key == 'duration':
+                    text = str(datetime.timedelta(seconds=int(value)))
+                elif key == 'path':
+                    text = os.path.relpath(os.path.dirname(value), self.root())
+                elif isinstance(value, float):
+                    text = f"{value:.2f}"
+                else:
+                    text = str(value)
+                item = QTableWidgetItem(text)
+                # keeps the trip's row in self.trips through sorting
+                item.setData(Qt.UserRole, row)
+                self.tripTable.setItem(row, col, item)
+        self.tripTable.setSortingEnabled(True)
+        self.tripTable.resizeColumnsToContents()
+        self.openB.setEnabled(bool(self.trips) and self.open_trip is not None)
+
+    def open_selected(self, *args):
+        items = self.tripTable.selectedItems()
+        if not items or self.open_trip is None:
+            return
+        self.open_trip(self.trips[items[0].data(Qt.UserRole)]['path'])
@@ -0,0 +1,53 @@
+import os
+import json
+
+from pages.topicIO import tmp_path
+
+# The .DADS trip file. MainApp marks the sections it changes (scenarios,
+# plots, info, lidar, ...) with touch(), so knowing whether there is
+# anything to save does not need the file to be read back and compared.
+# Files are written to a temporary file first and moved over the old one,
+# so a crash while saving never leaves half a trip behind. Trips above
+# COMPACT_SIZE are written without indentation, smaller and quicker to save
+# and load; smaller ones stay readable.
+
+COMPACT_SIZE = 1 << 20
+
+def load_dads(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def write_dads(path, data, compact=None):
+    # compact: True / False, or None to decide by COMPACT_SIZE
+    text = json.dumps(data, separators=(',', ':'))
+    if compact is False or (compact is None and len(text) < COMPACT_SIZE):
+        text = json.dumps(data, indent=4)
+    with open(tmp_path(path), 'w') as f:
+        f.write(text)
+    os.replace(tmp_path(path), path)
+
+
+class TripDocument:
+    def __init__(self, path='', data=None):
+        self.path = path
+        self.data = data if data is not None else {}
+        self.dirty = set()
+
+    @classmethod
+    def open(cls, path):
+        return cls(path, load_dads(path))
+
+    def touch(self, *sections):
+        self.dirty.update(sections)
+
+    def is_dirty(self):
+        return bool(self.path) and bool(self.dirty)
+
+    def save(self, path=None, compact=None):
+        if path is not None:
+            self.path = path
+        if not self.path:
+            return False
+        write_dads(self.path, self.data, compact)
+        self.dirty.clear()
+        return True
@@ -0,0 +1,228 @@
+import os
+import json
+import shutil
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from pages.topicIO import read_topics, find_topic_file, topic_columns, tmp_path
+
+# Topic columns of one trip shared by MainApp and the tools it opens. Each
+# (topic, column) is read once over all bags of the topic and kept as one
+# time sorted array; columns are loaded on first use and the least recently
+# used ones are dropped once the arrays go over max_bytes. The '.bag'
+# column holds the index in the topic's bag list of every row.
+#
+# Loaded columns are also written to csv/.trip_cache/<topic>/<column>.npy
+# and memory mapped from there the next time, as long as the topic files
+# they came from keep their size and mtime. Text columns that are not all
+# strings and topics read from bags (lazyTrip) are not cached on disk.
+
+MAX_BYTES = 512 << 20
+BAG = '.bag'
+CACHE_DIR = '.trip_cache'
+
+
+class TripStore:
+    def __init__(self, main_dict, max_bytes=MAX_BYTES):
+        self.main_dict = main_dict
+        self.max_bytes = max_bytes
+        self.cache = OrderedDict()
+        self.nbytes = 0
+        self.names = {}
+        self.missing = set()
+        # alignment.align results
+        self.aligned = OrderedDict()
+
+    @property
+    def pwd(self):
+        return self.main_dict['pwd']
+
+    def bags(self, topic):
+        return self.main_dict.get('topics', {}).get(topic, [])
+
+    def cache_dir(self, topic):
+        return os.path.join(self.pwd, 'csv', CACHE_DIR, topic)
+
+    def sources(self, topic):
+        # [bag, size, mtime] of every topic file, None when one has no file
+        stamps = []
+        for bag in self.bags(topic):
+            path = find_topic_file(os.path.join(self.pwd, 'csv'), bag, topic)
+            if path is None:
+                return None
+            st = os.stat(path)
+            stamps.append([bag, os.path.basename(path), st.st_size, st.st_mtime_ns])
+        return stamps
+
+    def read_meta(self, topic, sources):
+        try:
+            with open(os.path.join(self.cache_dir(topic), 'meta.json')) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = None
+        if meta is None or meta['sources'] != sources:
+            shutil.rmtree(self.cache_dir(topic), ignore_errors=True)
+            return {'sources': sources, 'missing': [], 'columns': None}
+        return meta
+
+    def write_meta(self, topic, meta):
+        path = os.path.join(self.cache_dir(topic), 'meta.json')
+        with open(tmp_path(path), 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path(path), path)
+
+    def load_cached(self, topic, columns, sources):
+        meta = self.read_meta(topic, sources)
+        arrays = {}
+        for col in [BAG] + columns:
+            if col in meta['missing']:
+                continue
+            try:
+                values = np.load(os.path.join(self.cache_dir(topic), col + '.npy'), mmap_mode='r', allow_pickle=False)
+            except (OSError, ValueError):
+                return False
+            # text is stored as fixed width unicode, handed out as object like a fresh read
+            arrays[col] = values.astype(object) if values.dtype.kind == 'U' else values
+        for col in columns:
+            if col in meta['missing']:
+                self.missing.add((topic, col))
+        for col, values in arrays.items():
+            self.put((topic, col), values)
+        self.evict(keep=[(topic, col) for col in arrays])
+        return True
+
+    def save_cached(self, topic, arrays, missing, sources):
+        try:
+            meta = self.read_meta(topic, sources)
+            os.makedirs(self.cache_dir(topic), exist_ok=True)
+            for col, values in arrays.items():
+                if os.sep in col:
+                    continue
+                if values.dtype == object:
+                    if not all(isinstance(v, str) for v in values):
+                        continue
+                    values = values.astype(str)
+                path = os.path.join(self.cache_dir(topic), col + '.npy')
+                with open(tmp_path(path), 'wb') as f:
+                    np.save(f, values)
+                os.replace(tmp_path(path), path)
+            meta['missing'] = sorted(set(meta['missing']) | set(missing))
+            if topic in self.names:
+                meta['columns'] = self.names[topic]
+            self.write_meta(topic, meta)
+        except OSError:
+            pass
+
+    def load(self, topic, columns=None):
+        # columns=None loads every column of the topic
+        sources = self.sources(topic) if self.bags(topic) else None
+        if columns is not None:
+            columns = [c for c in columns if (topic, c) not in self.cache and (topic, c) not in self.missing]
+            if not columns:
+                return
+            if sources is not None and self.load_cached(topic, columns, sources):
+                return
+            wanted = ['time'] + [c for c in columns if c not in ('time', BAG)]
+        else:
+            wanted = None
+        frames = read_topics(self.pwd, self.bags(topic), topic, wanted)
+        found = []
+        for frame in frames:
+            found += [c for c in frame.columns if c not in found]
+        if wanted is None:
+            self.names[topic] = wanted = found
+        if 'time' in found:
+            order = np.argsort(np.concatenate([frame['time'].to_numpy() for frame in frames]), kind='stable')
+        else:
+            order = None
+        labels = np.repeat(np.arange(len(frames), dtype=np.int32), [len(frame) for frame in frames])
+        arrays = {BAG: labels if order is None else labels[order]}
+        missing = []
+        for col in wanted:
+            if col not in found:
+                missing.append(col)
+                continue
+            parts = [np.asarray(frame[col]) if col in frame.columns else np.full(len(frame), np.nan)
+                     for frame in frames]
+            values = np.concatenate(parts) if parts else np.array([])
+            arrays[col] = values if order is None else values[order]
+        if sources is not None:
+            self.save_cached(topic, arrays, missing, sources)
+        for col in missing:
+            self.missing.add((topic, col))
+        for col, values in arrays.items():
+            self.put((topic, col), values)
+        self.evict(keep=[(topic, col) for col in arrays])
+
+    def put(self, key, values):
+        if key in self.cache:
+            self.nbytes -= self.cache.pop(key).nbytes
+        # shared by every tool, so nobody may change them in place
+        values.flags.writeable = False
+        self.cache[key] = values
+        self.nbytes += values.nbytes
+
+    def evict(self, keep=()):
+        for key in list(self.cache):
+            if self.nbytes <= self.max_bytes:
+                break
+            if key not in keep:
+                self.nbytes -= self.cache.pop(key).nbytes
+
+    def has(self, topic, column):
+        if not self.bags(topic):
+            return False
+        self.load(topic, [column])
+        return (topic, column) in self.cache
+
+    def column(self, topic, column):
+        self.load(topic, [column])
+        if (topic, column) not in self.cache:
+            raise KeyError(f"{topic} has no column {column}")
+        self.cache.move_to_end((topic, column))
+        return self.cache[(topic, column)]
+
+    def columns(self, topic, columns):
+        self.load(topic, columns)
+        return [self.column(topic, c) for c in columns]
+
+    def frame(self, topic, columns=None, bag=None):
+        # a copy, optionally only the rows of one bag
+        if columns is None:
+            columns = self.column_names(topic)
+        self.load(topic, list(columns) + [BAG])
+        columns = [c for c in columns if (topic, c) not in self.missing]
+        frame = pd.DataFrame({c: self.column(topic, c) for c in columns}, copy=True)
+        if bag is not None:
+            index = self.bags(topic).index(bag) if bag in self.bags(topic) else -1
+            frame = frame[self.column(topic, BAG) == index].reset_index(drop=True)
+        return frame
+
+    def column_names(self, topic):
+        if topic not in self.names:
+            sources = self.sources(topic) if self.bags(topic) else None
+            if sources is not None:
+                columns = self.read_meta(topic, sources)['columns']
+                if columns is not None:
+                    self.names[topic] = columns
+                    return columns
+            path = None
+            if self.bags(topic):
+                path = find_topic_file(os.path.join(self.pwd, 'csv'), self.bags(topic)[0], topic)
+            if path is not None:
+                self.names[topic] = topic_columns(path)
+            else:
+                self.load(topic)
+        return self.names.get(topic, [])
+
+    def invalidate(self, topic=None):
+        for key in [k for k in self.cache if topic is None or k[0] == topic]:
+            self.nbytes -= self.cache.pop(key).nbytes
+        self.missing = {k for k in self.missing if topic is not None and k[0] != topic}
+        self.aligned.clear()
+        if topic is None:
+            self.names = {}
+        else:
+            self.names.pop(topic, None)
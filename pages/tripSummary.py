@@ -0,0 +1,83 @@
+import os
+import json
+
+import numpy as np
+
+from pages.tripStore import CACHE_DIR
+from pages.topicIO import tmp_path
+
+# Trip statistics shown in MainApp's info list and the report's vehicle
+# dynamics, computed in one go from the trip's columns and kept in
+# csv/.trip_cache/summary.json together with the size and mtime of the
+# topic files they came from. They are recomputed only when one of those
+# files changed. Values a trip has no data for are None.
+
+SUMMARY_TOPICS = ['pos', 'ssc_velocity', 'vehi_steering_report']
+SUMMARY_VERSION = 1
+EARTH_RADIUS_KM = 6371.0088
+STOP_SPEED = 0.3
+SUMMARY_FIELDS = ['start_time', 'duration', 'distance_km', 'distance_mi', 'average_speed', 'max_speed',
+                  'full_stops', 'max_acceleration', 'max_deceleration', 'max_steering_rate']
+
+def path_length_km(lat, lon):
+    # haversine over consecutive fixes
+    lat, lon = np.radians(lat), np.radians(lon)
+    a = np.sin(np.diff(lat) / 2)**2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lon) / 2)**2
+    return float(np.sum(2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))))
+
+def read_columns(store, topic, columns):
+    if not all(store.has(topic, c) for c in columns):
+        return None
+    return [np.asarray(x, dtype=float) for x in store.columns(topic, columns)]
+
+def compute_summary(store):
+    summary = dict.fromkeys(SUMMARY_FIELDS)
+    pos = read_columns(store, 'pos', ['time', 'lat', 'lon'])
+    if pos is not None and len(pos[0]):
+        time, lat, lon = pos
+        summary['start_time'] = float(time[0] / 1e9)
+        summary['duration'] = float((time[-1] - time[0]) / 1e9)
+        summary['distance_km'] = path_length_km(lat, lon)
+        summary['distance_mi'] = summary['distance_km'] * 0.621371
+    speed = read_columns(store, 'ssc_velocity', ['velocity'])
+    if speed is not None and len(speed[0]):
+        speed = speed[0]
+        moving = speed[speed > 0]
+        summary['average_speed'] = float(np.mean(moving)) if len(moving) else 0.0
+        summary['max_speed'] = float(np.max(speed))
+        summary['full_stops'] = int(np.sum(np.diff((speed < STOP_SPEED).astype(int)) == 1))
+    accel = read_columns(store, 'ssc_velocity', ['acceleration'])
+    if accel is not None and len(accel[0]):
+        summary['max_acceleration'] = float(np.max(accel[0]))
+        summary['max_deceleration'] = float(np.min(accel[0]))
+    steering = read_columns(store, 'vehi_steering_report', ['time', 'steering_wheel_angle'])
+    if steering is not None and len(steering[0]) > 1:
+        dt = np.diff(steering[0]) / 1e9
+        rate = np.diff(steering[1])[dt > 0] / dt[dt > 0]
+        if len(rate):
+            summary['max_steering_rate'] = float(np.max(np.abs(rate)))
+    return summary
+
+def trip_summary(store):
+    sources = {topic: store.sources(topic) for topic in SUMMARY_TOPICS}
+    # bag backed topics have no files to check against
+    cacheable = all(x is not None for x in sources.values())
+    path = os.path.join(store.pwd, 'csv', CACHE_DIR, 'summary.json')
+    if cacheable:
+        try:
+            with open(path) as f:
+                cached = json.load(f)
+            if cached['version'] == SUMMARY_VERSION and cached['sources'] == sources:
+                return cached['summary']
+        except (OSError, ValueError, KeyError):
+            pass
+    summary = compute_summary(store)
+    if cacheable:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path(path), 'w') as f:
+                json.dump({'version': SUMMARY_VERSION, 'sources': sources, 'summary': summary}, f)
+            os.replace(tmp_path(path), path)
+        except OSError:
+            pass
+    return summary
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+# Form implementation generated from reading ui file './pages/UIs/trip_catalog.ui'
+#
+# Created by: PyQt5 UI code generator 5.15.11
+#
+# WARNING: Any manual changes made to this file will be lost when pyuic5 is
+# run again.  Do not edit this file unless you know what you are doing.
+
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+
+class Ui_Form(object):
+    def setupUi(self, Form):
+        Form.setObjectName("Form")
+        Form.resize(820, 480)
+        self.verticalLayout = QtWidgets.QVBoxLayout(Form)
+        self.verticalLayout.setObjectName("verticalLayout")
+        self.label = QtWidgets.QLabel(Form)
+        self.label.setObjectName("label")
+        self.verticalLayout.addWidget(self.label)
+        self.horizontalLayout = QtWidgets.QHBoxLayout()
+        self.horizontalLayout.setObjectName("horizontalLayout")
+        self.rootDir = QtWidgets.QListWidget(Form)
+        self.rootDir.setMinimumSize(QtCore.QSize(0, 25))
+        self.rootDir.setMaximumSize(QtCore.QSize(16777215, 25))
+        self.rootDir.setObjectName("rootDir")
+        self.horizontalLayout.addWidget(self.rootDir)
+        self.openDirB = QtWidgets.QPushButton(Form)
+        self.openDirB.setObjectName("openDirB")
+        self.horizontalLayout.addWidget(self.openDirB)
+        self.scanB = QtWidgets.QPushButton(Form)
+        self.scanB.setObjectName("scanB")
+        self.horizontalLayout.addWidget(self.scanB)
+        self.verticalLayout.addLayout(self.horizontalLayout)
+        self.horizontalLayout_2 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_2.setObjectName("horizontalLayout_2")
+        self.label_2 = QtWidgets.QLabel(Form)
+        self.label_2.setObjectName("label_2")
+        self.horizontalLayout_2.addWidget(self.label_2)
+        self.scenario = QtWidgets.QComboBox(Form)
+        self.scenario.setObjectName("scenario")
+        self.horizontalLayout_2.addWidget(self.scenario)
+        self.label_3 = QtWidgets.QLabel(Form)
+        self.label_3.setObjectName("label_3")
+        self.horizontalLayout_2.addWidget(self.label_3)
+        self.maxTtc = QtWidgets.QDoubleSpinBox(Form)
+        self.maxTtc.setMaximum(60.0)
+        self.maxTtc.setSingleStep(0.5)
+        self.maxTtc.setObjectName("maxTtc")
+        self.horizontalLayout_2.addWidget(self.maxTtc)
+        self.label_4 = QtWidgets.QLabel(Form)
+        self.label_4.setObjectName("label_4")
+        self.horizontalLayout_2.addWidget(self.label_4)
+        self.topic = QtWidgets.QComboBox(Form)
+        self.topic.setObjectName("topic")
+        self.horizontalLayout_2.addWidget(self.topic)
+        self.label_5 = QtWidgets.QLabel(Form)
+        self.label_5.setObjectName("label_5")
+        self.horizontalLayout_2.addWidget(self.label_5)
+        self.minDistance = QtWidgets.QDoubleSpinBox(Form)
+        self.minDistance.setMaximum(10000.0)
+        self.minDistance.setObjectName("minDistance")
+        self.horizontalLayout_2.addWidget(self.minDistance)
+        self.nameFilter = QtWidgets.QLineEdit(Form)
+        self.nameFilter.setObjectName("nameFilter")
+        self.horizontalLayout_2.addWidget(self.nameFilter)
+        self.verticalLayout.addLayout(self.horizontalLayout_2)
+        self.tripTable = QtWidgets.QTableWidget(Form)
+        self.tripTable.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.tripTable.setSelectionMode(QtWidgets.QAbstractItemView.SingleSelection)
+        self.tripTable.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.tripTable.setObjectName("tripTable")
+        self.tripTable.setColumnCount(0)
+        self.tripTable.setRowCount(0)
+        self.verticalLayout.addWidget(self.tripTable)
+        self.horizontalLayout_3 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_3.setObjectName("horizontalLayout_3")
+        self.report = QtWidgets.QLabel(Form)
+        self.report.setText("")
+        self.report.setObjectName("report")
+        self.horizontalLayout_3.addWidget(self.report)
+        spacerItem = QtWidgets.QSpacerItem(40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
+        self.horizontalLayout_3.addItem(spacerItem)
+        self.openB = QtWidgets.QPushButton(Form)
+        self.openB.setObjectName("openB")
+        self.horizontalLayout_3.addWidget(self.openB)
+        self.closeB = QtWidgets.QPushButton(Form)
+        self.closeB.setObjectName("closeB")
+        self.horizontalLayout_3.addWidget(self.closeB)
+        self.verticalLayout.addLayout(self.horizontalLayout_3)
+
+        self.retranslateUi(Form)
+        QtCore.QMetaObject.connectSlotsByName(Form)
+
+    def retranslateUi(self, Form):
+        _translate = QtCore.QCoreApplication.translate
+        Form.setWindowTitle(_translate("Form", "Trip Catalog"))
+        self.label.setText(_translate("Form", "Trips folder:"))
+        self.openDirB.setText(_translate("Form", "Browse"))
+        self.scanB.setText(_translate("Form", "Scan"))
+        self.label_2.setText(_translate("Form", "Scenario:"))
+        self.label_3.setText(_translate("Form", "TTC below (s):"))
+        self.maxTtc.setSpecialValueText(_translate("Form", "any"))
+        self.label_4.setText(_translate("Form", "Topic:"))
+        self.label_5.setText(_translate("Form", "Min distance (km):"))
+        self.minDistance.setSpecialValueText(_translate("Form", "any"))
+        self.nameFilter.setPlaceholderText(_translate("Form", "name"))
+        self.tripTable.setSortingEnabled(True)
+        self.openB.setText(_translate("Form", "Open"))
+        self.closeB.setText(_translate("Form", "Close"))
+
+
+if __name__ == "__main__":
+    import sys
+    app = QtWidgets.QApplication(sys.argv)
+    Form = QtWidgets.QWidget()
+    ui = Ui_Form()
+    ui.setupUi(Form)
+    Form.show()
+    sys.exit(app.exec_())
@@ -3,6 +3,10 @@ import pandas as pd
 import numpy as np
 import json
 
+from pages.topicIO import open_compressed
+from pages.tripStore import TripStore
+from pages.alignment import align
+
 def find_closest_lidar_timestamp(ts, keys, tolerance_ns=5e7):
     i = np.searchsorted(keys, ts)
     if i == 0:
@@ -14,8 +18,9 @@ def find_closest_lidar_timestamp(ts, keys, tolerance_ns=5e7):
 
 
 class TTCPlotApp():
-    def __init__(self, main_dict):
+    def __init__(self, main_dict, store=None):
         self.main_dict = main_dict
+        self.store = store if store is not None else TripStore(main_dict)
 
 
     def run(self):
@@ -24,7 +29,7 @@ class TTCPlotApp():
             return False
         
         lidar_file = os.path.join(self.main_dict['pwd'], self.main_dict['lidar'])
-        with open(lidar_file, 'r') as f:
+        with open_compressed(lidar_file) as f:
             lidar_data = json.load(f)
             lidar_data = {int(k): v for k, v in lidar_data.items()}
             lidar_keys = sorted(lidar_data.keys())
@@ -40,9 +45,10 @@ class TTCPlotApp():
         self.main_dict['topics'].pop('time_to_collision', None) #remove before add
         
         for bag in common:
-            fset = [os.path.join(base_path, bag + ext) for ext in [".ssc_velocity", ".pos", ".heading"]]
-            dfset = [pd.read_csv(f) for f in fset] 
-            ttc_df = self.calc_ttc(dfset[0], dfset[1], dfset[2], lidar_data, lidar_keys)
+            # ego data on the velocity clock
+            ego_df = align(self.store, [('ssc_velocity', ['velocity']), ('pos', ['lat', 'lon']), ('heading', ['heading'])],
+                           clock='ssc_velocity', tolerance=5e7, bag=bag)
+            ttc_df = self.calc_ttc(ego_df, lidar_data, lidar_keys)
             if not ttc_df is None:
                 ttc_file_path = os.path.join(base_path, bag + '.time_to_collision')
                 ttc_df.to_csv(ttc_file_path, index=None)
@@ -53,18 +59,7 @@ class TTCPlotApp():
         return 'time_to_collision' in self.main_dict['topics'].keys()
 
 
-    def calc_ttc(self, velocity_df, position_df, heading_df, lidar_data, lidar_keys):
-        velocity_df['time'] = velocity_df['time'].astype(np.int64)
-        position_df['time'] = position_df['time'].astype(np.int64)
-        heading_df['time'] = heading_df['time'].astype(np.int64)
-
-        # Merge ego data
-        ego_df = pd.merge_asof(pd.merge_asof(
-            velocity_df.sort_values('time'),
-            position_df.sort_values('time'),on='time',
-            direction='nearest',
-            tolerance=np.int64(5e7)),
-        heading_df.sort_values('time'),on='time',direction='nearest',tolerance=np.int64(5e7))
+    def calc_ttc(self, ego_df, lidar_data, lidar_keys):
         ego_df = ego_df.dropna(subset=['velocity', 'lat', 'lon', 'heading'])
         
         ego_df['heading_rad'] = np.deg2rad(ego_df['heading'])
@@ -0,0 +1,257 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+from rosbags.highlevel import AnyReader
+
+from pages.topicIO import (
+    tmp_path, open_topic_writer, config_hash, is_up_to_date, write_manifest, read_manifest, remove_manifest,
+    remove_topic_variants
+)
+from pages.bagExtract import (
+    ProgressCounter, TimedWriter, get_task_stats, output_path, get_window, get_sampler,
+    is_video_config, overlaps_window
+)
+
+# Image topics straight to mp4. A config key with a 'video' entry, e.g.
+#   "cam_front_video": {"topic": "/cam_front/image_raw/compressed", "video": {"fps": 30}}
+# reads sensor_msgs/Image or CompressedImage messages of all bags of a drive
+# as one stream into <drive>.<key>.mp4 in the bag folder. Next to it every
+# bag gets a '<bag>.<key>' sync table (time, seq, elapsed_time) in csv/, the
+# layout MainApp.video_camera_sync reads: seq is the frame number the video
+# player reports once that frame is shown, counted over the whole drive.
+# Messages are read on the task thread, decoded by a thread pool and
+# encoded on one more thread, so the three stages overlap; their stats are
+# summed over threads and can add up to more than the task's time.
+
+DECODE_THREADS = 4
+QUEUE_FRAMES = 32
+SYNC_COLS = ['seq', 'elapsed_time']
+
+# ROS encoding -> (dtype, channels, conversion to BGR)
+RAW_ENCODINGS = {
+    'bgr8': (np.uint8, 3, None),
+    'rgb8': (np.uint8, 3, cv2.COLOR_RGB2BGR),
+    'bgra8': (np.uint8, 4, cv2.COLOR_BGRA2BGR),
+    'rgba8': (np.uint8, 4, cv2.COLOR_RGBA2BGR),
+    'mono8': (np.uint8, 1, cv2.COLOR_GRAY2BGR),
+    '8UC1': (np.uint8, 1, cv2.COLOR_GRAY2BGR),
+    '8UC3': (np.uint8, 3, None),
+    'mono16': (np.uint16, 1, cv2.COLOR_GRAY2BGR),
+    '16UC1': (np.uint16, 1, cv2.COLOR_GRAY2BGR),
+    'bayer_rggb8': (np.uint8, 1, cv2.COLOR_BayerBG2BGR),
+    'bayer_bggr8': (np.uint8, 1, cv2.COLOR_BayerRG2BGR),
+    'bayer_gbrg8': (np.uint8, 1, cv2.COLOR_BayerGR2BGR),
+    'bayer_grbg8': (np.uint8, 1, cv2.COLOR_BayerGB2BGR),
+}
+
+def video_path(bag_dir, config_key):
+    drive = os.path.basename(os.path.normpath(bag_dir))
+    return os.path.join(bag_dir, f"{drive}.{config_key}.mp4")
+
+def video_tmp_path(path):
+    # the container is picked from the extension, so it has to stay last
+    return path[:-len('.mp4')] + '.tmp.mp4'
+
+def decode_image(msg):
+    if hasattr(msg, 'format'):
+        frame = cv2.imdecode(np.frombuffer(msg.data, np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError(f"Undecodable {msg.format} image")
+        return frame
+    if msg.encoding not in RAW_ENCODINGS:
+        raise ValueError(f"Unsupported image encoding {msg.encoding}")
+    dtype, channels, conversion = RAW_ENCODINGS[msg.encoding]
+    dtype = np.dtype(dtype).newbyteorder('>' if msg.is_bigendian else '<')
+    rows = np.frombuffer(msg.data, dtype).reshape(msg.height, msg.step // dtype.itemsize)
+    frame = rows[:, :msg.width * channels].reshape(msg.height, msg.width, channels)
+    if dtype.itemsize == 2:
+        frame = (frame >> 8).astype(np.uint8)
+    frame = np.ascontiguousarray(frame)
+    return frame if conversion is None else cv2.cvtColor(frame, conversion)
+
+def estimate_fps(connections, window, config):
+    # from the bag index, no message is read; frame intervals and spans are
+    # summed per bag so the gaps between bags do not count
+    start, stop = window or (None, None)
+    sampler = get_sampler(config)
+    times = sorted((x.time, id(c.owner)) for c in connections for x in c.owner.indexes.get(c.id, [])
+                   if (start is None or x.time >= start) and (stop is None or x.time < stop))
+    if sampler is not None:
+        times = [(t, owner) for t, owner in times if sampler.keep(t)]
+    per_bag = {}
+    for t, owner in times:
+        per_bag.setdefault(owner, []).append(t)
+    frames = sum(len(x) - 1 for x in per_bag.values())
+    span = sum(x[-1] - x[0] for x in per_bag.values())
+    if frames < 1 or span <= 0:
+        return 30.0
+    return frames / (span / 1e9)
+
+def gen_video_task(args):
+    worker_id, task, options, typestore = args
+    bag_list, bag_dir, target_dir, config, config_key = task
+
+    VIDEO_NAME = video_path(bag_dir, config_key)
+    WINDOW = get_window(options)
+    CONFIG_HASH = config_hash(config, 'mp4', WINDOW)
+    tables = {bag_name: output_path(target_dir, bag_name, config_key, config, options) for bag_name in bag_list}
+    label = f"{config_key} | {os.path.basename(VIDEO_NAME)}"
+
+    if not options['override'] and os.path.exists(VIDEO_NAME) and all(
+            is_up_to_date(path, os.path.join(bag_dir, bag_name), CONFIG_HASH) for bag_name, path in tables.items()):
+        return f"[Worker {worker_id}] Skipped {label}"
+
+    writers = {}
+    video = None
+    try:
+        for bag_name, path in tables.items():
+            write_manifest(path, os.path.join(bag_dir, bag_name), CONFIG_HASH, 0, complete=False)
+        bag_paths = [Path(os.path.join(bag_dir, bag_name)) for bag_name in bag_list]
+        with AnyReader(bag_paths, default_typestore=typestore) as reader:
+            connections = [x for x in reader.connections if x.topic == config['topic']]
+            if not connections:
+                for bag_name, path in tables.items():
+                    write_manifest(path, os.path.join(bag_dir, bag_name), CONFIG_HASH, 0)
+                return f"[Worker {worker_id}] Failed {label} (No topic match)"
+            owners = {id(r): p.name for r, p in zip(reader.readers, bag_paths)}
+            fps = config['video'].get('fps') or estimate_fps(connections, WINDOW, config)
+            size = config['video'].get('size')
+            sampler = get_sampler(config)
+            start, stop = WINDOW or (None, None)
+            counts = {bag_name: 0 for bag_name in bag_list}
+            state = {'seq': 0, 'first': None}
+            stats = get_task_stats()
+            lock = threading.Lock()
+
+            def book(stage, started):
+                with lock:
+                    stats.stages[stage] += time.perf_counter() - started
+
+            def decode(raw_msg, msgtype):
+                started = time.perf_counter()
+                frame = decode_image(reader.deserialize(raw_msg, msgtype))
+                if size is not None and (frame.shape[1], frame.shape[0]) != tuple(size):
+                    frame = cv2.resize(frame, tuple(size))
+                book('deserialize', started)
+                return frame
+
+            def encode(frame):
+                started = time.perf_counter()
+                video.write(frame)
+                book('write', started)
+
+            with ThreadPoolExecutor(DECODE_THREADS) as decoders, ThreadPoolExecutor(1) as encoder:
+                decoding = deque()
+                encoding = deque()
+
+                def emit(bag_name, t, future):
+                    nonlocal video, size
+                    frame = future.result()
+                    if video is None:
+                        size = (frame.shape[1], frame.shape[0])
+                        video = cv2.VideoWriter(video_tmp_path(VIDEO_NAME), cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+                        if not video.isOpened():
+                            raise IOError(f"Cannot open {video_tmp_path(VIDEO_NAME)} for writing")
+                    elif (frame.shape[1], frame.shape[0]) != size:
+                        frame = cv2.resize(frame, size)
+                    encoding.append(encoder.submit(encode, frame))
+                    if len(encoding) > QUEUE_FRAMES:
+                        encoding.popleft().result()
+                    if state['first'] is None:
+                        state['first'] = t
+                    state['seq'] += 1
+                    if bag_name not in writers:
+                        writers[bag_name] = TimedWriter(open_topic_writer(tables[bag_name], SYNC_COLS,
+                                                                          config.get('format', options['format'])),
+                                                        stats, config_key)
+                    with lock:
+                        writers[bag_name].write_rows([(t, state['seq'], (t - state['first']) / 1e9)])
+
+                counter = ProgressCounter()
+                stats.lap()
+                for c, t, raw_msg in reader.messages(connections=connections, start=start, stop=stop):
+                    counter.tick()
+                    with lock:
+                        stats.message(c.topic, len(raw_msg))
+                    bag_name = owners[id(c.owner)]
+                    counts[bag_name] += 1
+                    if sampler is not None and not sampler.keep(t):
+                        continue
+                    decoding.append((bag_name, t, decoders.submit(decode, raw_msg, c.msgtype)))
+                    if len(decoding) >= QUEUE_FRAMES:
+                        emit(*decoding.popleft())
+                    stats.lap()
+                while decoding:
+                    emit(*decoding.popleft())
+                while encoding:
+                    encoding.popleft().result()
+                counter.flush()
+
+        if video is None:
+            for bag_name, path in tables.items():
+                write_manifest(path, os.path.join(bag_dir, bag_name), CONFIG_HASH, counts[bag_name], rows=0)
+            return f"[Worker {worker_id}] Failed {label} (Empty)"
+        rows = {bag_name: writer.rows for bag_name, writer in writers.items()}
+        for bag_name, path in tables.items():
+            # a writer leaves the dict once its table is in place
+            if bag_name in writers:
+                writers[bag_name].close()
+                del writers[bag_name]
+            elif os.path.exists(path):
+                os.remove(path)
+        video.release()
+        os.replace(video_tmp_path(VIDEO_NAME), VIDEO_NAME)
+        for bag_name, path in tables.items():
+            write_manifest(path, os.path.join(bag_dir, bag_name), CONFIG_HASH, counts[bag_name],
+                           rows=rows.get(bag_name, 0))
+            remove_topic_variants(path)
+    except Exception as e:
+        for writer in writers.values():
+            writer.discard()
+        if video is not None:
+            video.release()
+        if os.path.exists(video_tmp_path(VIDEO_NAME)):
+            os.remove(video_tmp_path(VIDEO_NAME))
+        return f"[Worker {worker_id}] Error {label}: {e}"
+    return f"[Worker {worker_id}] Completed {label} ({state['seq']} frames, {fps:.1f} fps)"
+
+def build_video_tasks(bag_dir, bag_list, cfg, catalog=None, window=None):
+    # one task per video config key over all bags recording its topic (and
+    # overlapping the window), in recording order so frame numbers follow time
+    target_dir = os.path.join(bag_dir, 'csv')
+    if catalog:
+        bag_list = sorted(bag_list, key=lambda bag_name: (catalog.get(bag_name) or {}).get('start') or 0)
+    tasks = []
+    for config_key, config in cfg.items():
+        if not is_video_config(config):
+            continue
+        bags = bag_list
+        if catalog:
+            bags = [bag_name for bag_name in bag_list if catalog.get(bag_name) is None or (
+                config['topic'] in catalog[bag_name]['topics'] and overlaps_window(catalog[bag_name], window))]
+        if bags:
+            tasks.append((tuple(bags), bag_dir, target_dir, config, config_key))
+    return tasks
+
+def clean_up_video(tasks, unfinished, options):
+    removed = 0
+    for index in unfinished:
+        bag_list, bag_dir, target_dir, config, config_key = tasks[index]
+        paths = [video_tmp_path(video_path(bag_dir, config_key))]
+        for bag_name in bag_list:
+            path = output_path(target_dir, bag_name, config_key, config, options)
+            paths.append(tmp_path(path))
+            manifest = read_manifest(path)
+            if manifest is not None and not manifest['complete']:
+                remove_manifest(path)
+        for x in paths:
+            if os.path.exists(x):
+                os.remove(x)
+                removed += 1
+    return removed
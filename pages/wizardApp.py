@@ -12,7 +12,8 @@ import json
 from PyQt5 import QtCore, QtGui, QtWidgets
 from PyQt5.QtWidgets import (
     QApplication, QLabel, QPushButton, QVBoxLayout, QHBoxLayout,
-    QWidget, QSlider, QFileDialog, QDialog, QStackedWidget, QListWidgetItem
+    QWidget, QSlider, QFileDialog, QDialog, QStackedWidget, QListWidgetItem,
+    QProgressDialog, QMessageBox
 )
 from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QPixmap, QImage
@@ -27,7 +28,13 @@ from pages.wizard3 import Ui_Wiz_3
 from pages.wizard4 import Ui_Wiz_4
 
 from pages.videoProcessApp import VideoApp
-from pages.bagToCsvApp import BagToCsvApp
+from pages.bagToCsvApp import BagToCsvApp, ExtractionJob
+from pages.bagExtract import load_config
+from pages.topicIO import read_topics, split_topic_file
+from pages.bagCatalog import load_catalog, config_keys, describe_topic
+from pages.lazyTrip import register_bag_source, trip_config
+from pages.videoExtract import video_path
+from pages.tripDoc import write_dads
 
 class Page1(QtWidgets.QWidget, Ui_Wiz_1):
     def __init__(self, stacked_widget):
@@ -91,7 +98,58 @@ class Page1(QtWidgets.QWidget, Ui_Wiz_1):
         self.main_dict['bags'] = [self.baglist.item(i).text().replace(self.main_dict['pwd'], '') for i in range(self.baglist.count())]
     
     def to_csv(self):
+        # without bags in the list fall back to the standalone tool, otherwise
+        # extract the missing topics of the listed bags with the default config
+        # (csv, fast path); the summary offers the tool for other settings
+        if self.baglist.count() == 0:
+            self.open_to_csv_tool()
+            return
+        cfg = load_config(BagToCsvApp.default_config_path)
+        bags = [self.baglist.item(i).text() for i in range(self.baglist.count())]
+        options = {'override': False, 'format': 'csv', 'fast_path': True}
+        self.to_csv_log = []
+        self.job = ExtractionJob(os.path.dirname(bags[0]), bags, cfg, options)
+        self.job.message.connect(self.to_csv_log.append)
+        self.job.finished.connect(self.to_csv_done)
+        self.progress = QProgressDialog("Extracting topics...", "Cancel", 0, 0, self)
+        self.progress.setWindowTitle("To CSV")
+        self.progress.setWindowModality(Qt.WindowModal)
+        self.progress.canceled.connect(self.job.cancel)
+        self.job.progress.connect(self.to_csv_progress)
+        self.job.rate.connect(lambda msgs, rate: self.progress.setLabelText(f"{msgs} msgs | {rate:.0f} msgs/s"))
+        self.job.finished.connect(self.progress.reset)
+        self.toCsvB.setEnabled(False)
+        self.job.finished.connect(lambda: self.toCsvB.setEnabled(True))
+        self.job.start()
+        self.progress.show()
+
+    def to_csv_progress(self, done, total):
+        self.progress.setMaximum(total)
+        self.progress.setValue(done)
+
+    def to_csv_done(self):
+        counts = {}
+        for line in self.to_csv_log:
+            for word in ('Completed', 'Skipped', 'Failed', 'Error'):
+                if f"] {word} " in line:
+                    counts[word] = counts.get(word, 0) + 1
+        msg = QMessageBox(self)
+        msg.setWindowTitle("To CSV")
+        msg.setIcon(QMessageBox.Warning if 'Error' in counts else QMessageBox.Information)
+        msg.setText(', '.join(f"{v} {k.lower()}" for k, v in counts.items()) or "Nothing extracted")
+        msg.setInformativeText(next((line for line in reversed(self.to_csv_log)
+                                     if line.startswith(('All tasks', 'Cancelled'))), ""))
+        msg.setDetailedText('\n'.join(self.to_csv_log))
+        tool = msg.addButton("Open To CSV Tool", QMessageBox.ActionRole)
+        msg.addButton(QMessageBox.Ok)
+        msg.exec_()
+        if msg.clickedButton() is tool:
+            self.open_to_csv_tool()
+
+    def open_to_csv_tool(self):
         self.to_csv_window = BagToCsvApp()
+        if self.baglist.count():
+            self.to_csv_window.set_bags([self.baglist.item(i).text() for i in range(self.baglist.count())])
         self.to_csv_window.show()
 
 
@@ -115,11 +173,13 @@ class Page2(QtWidgets.QWidget, Ui_Wiz_2):
         self.stacked_widget.widget(2).get_dict(self.main_dict)
         self.stacked_widget.setCurrentIndex(2)
 
-    def add_item(self, text):
+    def add_item(self, text, tooltip=None):
         if text:
             item = QListWidgetItem(text)
             item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
             item.setCheckState(Qt.Unchecked)
+            if tooltip:
+                item.setToolTip(tooltip)
             self.topiclist.addItem(item)
 
     def updateList(self):
@@ -132,7 +192,7 @@ class Page2(QtWidgets.QWidget, Ui_Wiz_2):
                 topics.append(topic)
         topics = np.unique(topics)
         for topic in topics:
-            self.add_item(topic)
+            self.add_item(topic, self.topic_info.get(topic))
 
     def handle_item_click(self, item):
         if item.text() == 'Select All':
@@ -157,14 +217,30 @@ class Page2(QtWidgets.QWidget, Ui_Wiz_2):
         return checked
     
     def get_dict(self, dict):
+        # topics come from the bag catalog (default config keys recorded in
+        # each bag) plus whatever was already extracted with other configs
         self.main_dict = dict
         tmp = {}
-        csv_list = os.listdir(os.path.join(self.main_dict['pwd'], 'csv'))
+        csv_dir = os.path.join(self.main_dict['pwd'], 'csv')
+        csv_list = os.listdir(csv_dir) if os.path.isdir(csv_dir) else []
+        cfg = load_config(BagToCsvApp.default_config_path)
+        self.cfg = cfg
+        catalog = load_catalog([os.path.join(self.main_dict['pwd'], bag) for bag in self.main_dict['bags']])
+        self.topic_info = {}
         for bag in self.main_dict['bags']:
-            tmp[os.path.basename(bag)] = {'dir': os.path.join(self.main_dict['pwd'], 'csv'), 'topics': []}
+            bag_name = os.path.basename(bag)
+            tmp[bag_name] = {'dir': csv_dir, 'topics': []}
             for csv in csv_list:
-                if csv.startswith(os.path.basename(bag)):
-                    tmp[os.path.basename(bag)]['topics'].append(csv.split('.')[-1])
+                csv_bag, topic = split_topic_file(csv)
+                if csv_bag == bag_name and topic not in tmp[bag_name]['topics']:
+                    tmp[bag_name]['topics'].append(topic)
+            entry = catalog.get(bag_name)
+            for key in config_keys(entry, cfg):
+                info = f"{cfg[key]['topic']}: {describe_topic(entry['topics'][cfg[key]['topic']])}"
+                if key not in tmp[bag_name]['topics']:
+                    tmp[bag_name]['topics'].append(key)
+                    info += " (not extracted yet)"
+                self.topic_info.setdefault(key, info)
         self.bag_dict = tmp
         self.updateList()
     
@@ -177,6 +253,8 @@ class Page2(QtWidgets.QWidget, Ui_Wiz_2):
                 if topic in self.bag_dict[key]['topics']:
                     tmp[topic].append(key)
         self.main_dict['topics'] = tmp
+        # lets the trip open topics that are not extracted yet straight from the bags
+        self.main_dict['config'] = trip_config(self.main_dict, self.cfg)
 
 
 class Page3(QtWidgets.QWidget, Ui_Wiz_3):
@@ -219,6 +297,12 @@ class Page3(QtWidgets.QWidget, Ui_Wiz_3):
 
     def get_dict(self, dict):
         self.main_dict = dict
+        # videos extracted from the bags come with their sync tables
+        if self.videoList.count() == 0:
+            for topic in self.main_dict['topics']:
+                path = video_path(self.main_dict['pwd'], topic)
+                if os.path.exists(path):
+                    self.videoList.addItem(path)
     
     def update_dict(self):
         self.main_dict['video'] = []
@@ -257,13 +341,13 @@ class Page4(QtWidgets.QWidget, Ui_Wiz_4):
         if file_path:
             if not file_path.endswith('.DADS'):
                 file_path += '.DADS'
-            with open(file_path, 'w') as f:
-                json.dump(self.main_dict, f, indent=4)
+            write_dads(file_path, self.main_dict)
             self.close()
 
 
     def get_dict(self, dict):
         self.main_dict = dict
+        register_bag_source(self.main_dict['pwd'], self.main_dict.get('config', {}))
         self.add_Item('Select All')
         self.add_Item('Deselect All')
         for item in self.main_dict['topics']['gps']:
@@ -296,8 +380,7 @@ class Page4(QtWidgets.QWidget, Ui_Wiz_4):
         gps_list = self.get_checked_items()
         points = []
         center = [0, 0]
-        for f in gps_list:
-            data = pd.read_csv(os.path.join(self.main_dict['pwd'], 'csv', f + '.pos'))
+        for data in read_topics(self.main_dict['pwd'], gps_list, 'pos', ['lat', 'lon']):
             for lat, lon in zip(data['lat'], data['lon']):
                 points.append([lat, lon])
         lat = np.array([i[0] for i in points])